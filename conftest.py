@@ -0,0 +1,11 @@
+import pytest
+
+from core.runner import isolate, restore
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_files(django_test_environment):
+    """Кеш, метрики и журналы тестов — во временном каталоге."""
+    isolation = isolate()
+    yield
+    restore(*isolation)
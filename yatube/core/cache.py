@@ -0,0 +1,281 @@
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import timing
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL,
+        accessed REAL NOT NULL,
+        size INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)",
+    "CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)",
+    "CREATE TABLE IF NOT EXISTS cache_size (total INTEGER NOT NULL)",
+    """INSERT INTO cache_size (total)
+        SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM cache_size)""",
+    """CREATE TRIGGER IF NOT EXISTS cache_size_insert
+        AFTER INSERT ON cache
+        BEGIN UPDATE cache_size SET total = total + NEW.size; END""",
+    """CREATE TRIGGER IF NOT EXISTS cache_size_delete
+        AFTER DELETE ON cache
+        BEGIN UPDATE cache_size SET total = total - OLD.size; END""",
+    """CREATE TRIGGER IF NOT EXISTS cache_size_update
+        AFTER UPDATE OF size ON cache
+        BEGIN
+            UPDATE cache_size SET total = total - OLD.size + NEW.size;
+        END""",
+)
+UPSERT = """
+    INSERT INTO cache (key, value, expires, accessed, size)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (key) DO UPDATE SET
+        value = excluded.value,
+        expires = excluded.expires,
+        accessed = excluded.accessed,
+        size = excluded.size
+"""
+SQLITE_INTEGER_RANGE = range(-2 ** 63, 2 ** 63)
+# Время последнего чтения обновляется не чаще, чем раз в столько секунд:
+# для LRU такой точности хватает, а чтения почти не пишут в файл.
+ACCESS_RESOLUTION: int = 10
+CULL_BATCH_SIZE: int = 100
+CULL_TARGET: float = 0.9
+
+_l1_stores = {}
+_l1_locks = {}
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite (WAL), общий для всех процессов сервера.
+
+    Целые числа хранятся как INTEGER, поэтому incr() атомарен между
+    процессами, остальное сериализуется pickle. При превышении MAX_BYTES
+    вытесняются давно не читанные записи. Перед файлом стоит небольшой
+    L1-кеш процесса: он держит самые горячие ключи не дольше L1_TIMEOUT
+    секунд и никогда не хранит целые числа (счётчики версий), чтобы
+    инвалидация из другого процесса была видна сразу.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._path = location
+        self._max_bytes = int(options.get("MAX_BYTES", 64 * 1024 * 1024))
+        self._busy_timeout = float(options.get("BUSY_TIMEOUT", 5))
+        self._l1_max_entries = int(options.get("L1_MAX_ENTRIES", 300))
+        self._l1_timeout = float(options.get("L1_TIMEOUT", 2))
+        self._l1 = _l1_stores.setdefault(location, OrderedDict())
+        self._l1_lock = _l1_locks.setdefault(location, threading.Lock())
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self._path, timeout=self._busy_timeout,
+                isolation_level=None, check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("BEGIN IMMEDIATE")
+            for statement in SCHEMA:
+                connection.execute(statement)
+            connection.execute("COMMIT")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _write(self):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _encode(self, value):
+        if type(value) is int and value in SQLITE_INTEGER_RANGE:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _decode(self, raw):
+        if isinstance(raw, int):
+            return raw
+        return pickle.loads(raw)
+
+    def _size(self, key, raw):
+        return len(key) + (8 if isinstance(raw, int) else len(raw))
+
+    def _l1_get(self, key, now):
+        with self._l1_lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+            return entry[0]
+
+    def _l1_set(self, key, raw, expires, now):
+        if not self._l1_max_entries or isinstance(raw, int):
+            return
+        l1_expires = now + self._l1_timeout
+        if expires is not None:
+            l1_expires = min(l1_expires, expires)
+        with self._l1_lock:
+            self._l1[key] = (raw, l1_expires)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_discard(self, key):
+        with self._l1_lock:
+            self._l1.pop(key, None)
+
+    def _cull(self, connection, now):
+        total = connection.execute(
+            "SELECT total FROM cache_size").fetchone()[0]
+        if total <= self._max_bytes:
+            return
+        connection.execute(
+            "DELETE FROM cache WHERE expires <= ?", (now,))
+        target = self._max_bytes * CULL_TARGET
+        while True:
+            total = connection.execute(
+                "SELECT total FROM cache_size").fetchone()[0]
+            if total <= target:
+                return
+            deleted = connection.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                (CULL_BATCH_SIZE,),
+            ).rowcount
+            if not deleted:
+                return
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        raw = self._encode(value)
+        now = time.time()
+        with self._write() as connection:
+            connection.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?",
+                (key, now))
+            added = connection.execute(
+                "INSERT OR IGNORE INTO cache "
+                "(key, value, expires, accessed, size) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, raw, self.get_backend_timeout(timeout), now,
+                 self._size(key, raw)),
+            ).rowcount == 1
+            if added:
+                self._cull(connection, now)
+        self._l1_discard(key)
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        raw = self._l1_get(key, now)
+        if raw is not None:
+            timing.incr("cache_hit")
+            return self._decode(raw)
+        row = self._connection().execute(
+            "SELECT value, expires, accessed FROM cache WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            timing.incr("cache_miss")
+            return default
+        raw, expires, accessed = row
+        if expires is not None and expires <= now:
+            timing.incr("cache_miss")
+            return default
+        if now - accessed > ACCESS_RESOLUTION:
+            with self._write() as connection:
+                connection.execute(
+                    "UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        self._l1_set(key, raw, expires, now)
+        timing.incr("cache_hit")
+        return self._decode(raw)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        raw = self._encode(value)
+        now = time.time()
+        with self._write() as connection:
+            connection.execute(
+                UPSERT,
+                (key, raw, self.get_backend_timeout(timeout), now,
+                 self._size(key, raw)),
+            )
+            self._cull(connection, now)
+        self._l1_discard(key)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            touched = connection.execute(
+                "UPDATE cache SET expires = ? WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (self.get_backend_timeout(timeout), key, now),
+            ).rowcount == 1
+        self._l1_discard(key)
+        return touched
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+        self._l1_discard(key)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            "SELECT 1 FROM cache WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            row = connection.execute(
+                "SELECT value, expires FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                raise ValueError("Key '%s' not found" % key)
+            value = self._decode(row[0]) + delta
+            raw = self._encode(value)
+            connection.execute(
+                "UPDATE cache SET value = ?, size = ?, accessed = ? "
+                "WHERE key = ?",
+                (raw, self._size(key, raw), now, key),
+            )
+        self._l1_discard(key)
+        return value
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute("DELETE FROM cache")
+        with self._l1_lock:
+            self._l1.clear()
@@ -0,0 +1,67 @@
+"""Чтение с реплик, запись в основную базу.
+
+Маршрутизация действует только внутри запроса, который начала
+ReplicaMiddleware; команды и фоновые воркеры работают с основной базой.
+Запрос, который уже писал, и запросы в окне «прочитай свою запись»
+после него читают из основной базы: реплика может отставать.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_state = ContextVar("replica_state", default=None)
+
+# Сессии читаются из основной базы: иначе только что вошедший
+# пользователь выглядел бы анонимом, пока реплика отстаёт.
+PRIMARY_APPS = {"sessions"}
+
+
+class State:
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def start(pinned=False):
+    """Начинает маршрутизацию запроса; возвращает токен для stop()."""
+    return _state.set(State(pinned))
+
+
+def stop(token):
+    state = _state.get()
+    _state.reset(token)
+    return state
+
+
+def reads_replica():
+    """Читает ли текущий запрос с реплик.
+
+    Страница, собранная по реплике, может не содержать свежих записей,
+    поэтому кеши страниц хранят её отдельно от собранной по основной базе.
+    """
+    state = _state.get()
+    return not (state is None or state.pinned or state.wrote
+                or not settings.DATABASE_REPLICAS)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (not reads_replica()
+                or model._meta.app_label in PRIMARY_APPS):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, объекты из них совместимы.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
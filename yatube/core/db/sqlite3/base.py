@@ -0,0 +1,35 @@
+"""SQLite с настройками для одновременного чтения и записи.
+
+WAL позволяет лентам читать, пока post_create пишет; synchronous=NORMAL
+в режиме WAL не теряет целостность при сбое процесса, mmap и кеш страниц
+сокращают системные вызовы. Транзакции начинаются с BEGIN IMMEDIATE:
+блокировка записи берётся сразу и ждёт busy_timeout, а не падает с
+«database is locked» при попытке повысить блокировку чтения.
+
+Значения PRAGMAS можно переопределить в DATABASES[...]["OPTIONS"]
+["pragmas"]; None отключает прагму.
+"""
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        conn_params = dict(conn_params)
+        pragmas = dict(PRAGMAS, **conn_params.pop("pragmas", {}))
+        connection = super().get_new_connection(conn_params)
+        for name, value in pragmas.items():
+            if value is not None:
+                connection.execute(f"PRAGMA {name} = {value}")
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
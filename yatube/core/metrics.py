@@ -0,0 +1,218 @@
+"""Метрики в формате Prometheus, общие для всех процессов сервера.
+
+Каждый процесс пишет свои значения в отдельный файл METRICS_DIR,
+отображённый в память, а /metrics складывает файлы всех процессов.
+Так счётчики не теряются между воркерами и не требуют блокировок
+между процессами: у каждого файла ровно один писатель.
+
+Формат файла: 8 байт заголовка (занятый размер), затем записи
+[длина ключа: 4 байта][ключ UTF-8, выровненный до 8 байт][float64].
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+INITIAL_SIZE: int = 64 * 1024
+HEADER = struct.Struct("i4x")
+KEY_LENGTH = struct.Struct("i")
+VALUE = struct.Struct("d")
+
+# Имя метрики: (тип, описание).
+METRICS = {
+    "yatube_requests_total": (
+        "counter", "Число запросов по имени адреса, методу и статусу"),
+    "yatube_request_duration_seconds": (
+        "histogram", "Время обработки запроса"),
+    "yatube_db_queries": ("histogram", "Число SQL-запросов на запрос"),
+    "yatube_cache_requests_total": (
+        "counter", "Чтения кеша: hit — найдено, miss — нет"),
+    "yatube_cache_hit_ratio": ("gauge", "Доля попаданий в кеш"),
+    "yatube_objects_created_total": (
+        "counter", "Созданные посты, комментарии и подписки"),
+}
+BUCKETS = {
+    "yatube_request_duration_seconds": (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    "yatube_db_queries": (1, 2, 3, 5, 8, 13, 21, 34, 55),
+}
+INF = "+Inf"
+
+
+def make_key(name, labels):
+    return f"{name}|{json.dumps(labels, sort_keys=True, ensure_ascii=False)}"
+
+
+def split_key(key):
+    name, labels = key.split("|", 1)
+    return name, json.loads(labels)
+
+
+def padded(length):
+    return (length + KEY_LENGTH.size + 7) // 8 * 8
+
+
+def read_entries(data):
+    """Пары (ключ, значение, смещение значения) из содержимого файла."""
+    used = HEADER.unpack_from(data, 0)[0]
+    position = HEADER.size
+    while position < used:
+        length = KEY_LENGTH.unpack_from(data, position)[0]
+        start = position + KEY_LENGTH.size
+        key = bytes(data[start:start + length]).decode()
+        offset = position + padded(length)
+        yield key, VALUE.unpack_from(data, offset)[0], offset
+        position = offset + VALUE.size
+
+
+class MmapStore:
+    """Значения метрик одного процесса в файле, отображённом в память."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, "a+b")
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._used = HEADER.unpack_from(self._map, 0)[0]
+        if not self._used:
+            self._used = HEADER.size
+            HEADER.pack_into(self._map, 0, self._used)
+        self._positions = {key: offset
+                           for key, _, offset in read_entries(self._map)}
+
+    def inc(self, key, amount=1):
+        with self._lock:
+            offset = self._positions.get(key)
+            if offset is None:
+                offset = self._add(key)
+            value = VALUE.unpack_from(self._map, offset)[0]
+            VALUE.pack_into(self._map, offset, value + amount)
+
+    def _add(self, key):
+        encoded = key.encode()
+        size = padded(len(encoded)) + VALUE.size
+        if self._used + size > len(self._map):
+            self._grow(self._used + size)
+        position = self._used
+        KEY_LENGTH.pack_into(self._map, position, len(encoded))
+        start = position + KEY_LENGTH.size
+        self._map[start:start + len(encoded)] = encoded
+        offset = position + padded(len(encoded))
+        VALUE.pack_into(self._map, offset, 0.0)
+        # Размер обновляется последним: читатели не видят запись частично.
+        self._used += size
+        HEADER.pack_into(self._map, 0, self._used)
+        self._positions[key] = offset
+        return offset
+
+    def _grow(self, needed):
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def store():
+    """Файл текущего процесса; после fork у потомка будет свой файл."""
+    global _store
+    directory = settings.METRICS_DIR
+    pid = os.getpid()
+    if _store is None or _store[:2] != (directory, pid):
+        with _store_lock:
+            if _store is None or _store[:2] != (directory, pid):
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, f"metrics-{pid}.db")
+                _store = (directory, pid, MmapStore(path))
+    return _store[2]
+
+
+def inc(name, amount=1, **labels):
+    store().inc(make_key(name, labels), amount)
+
+
+def observe(name, value, **labels):
+    """Добавляет наблюдение в гистограмму с корзинами из BUCKETS."""
+    bucket = next((str(le) for le in BUCKETS[name] if value <= le), INF)
+    target = store()
+    target.inc(make_key(f"{name}_bucket", dict(labels, le=bucket)))
+    target.inc(make_key(f"{name}_sum", labels), value)
+    target.inc(make_key(f"{name}_count", labels))
+
+
+def collect():
+    """Сумма значений по файлам всех процессов."""
+    totals = defaultdict(float)
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, "*.db")):
+        with open(path, "rb") as file:
+            data = file.read()
+        if len(data) < HEADER.size:
+            continue
+        for key, value, _ in read_entries(data):
+            totals[key] += value
+    return totals
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\")
+                         .replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in sorted(labels.items()))
+    return "{" + pairs + "}"
+
+
+def render():
+    """Текст для Prometheus (text exposition format 0.0.4)."""
+    samples = defaultdict(list)
+    histograms = defaultdict(lambda: defaultdict(float))
+    for key, value in collect().items():
+        name, labels = split_key(key)
+        if name.endswith("_bucket") and name[:-7] in BUCKETS:
+            le = labels.pop("le")
+            group = json.dumps(labels, sort_keys=True)
+            histograms[name[:-7]][group, le] += value
+        else:
+            samples[name].append((labels, value))
+    hits = sum(value for labels, value in
+               samples["yatube_cache_requests_total"]
+               if labels.get("result") == "hit")
+    reads = sum(value for _, value in samples["yatube_cache_requests_total"])
+    if reads:
+        samples["yatube_cache_hit_ratio"].append(({}, hits / reads))
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind != "histogram":
+            for labels, value in sorted(samples[name], key=str):
+                lines.append(f"{name}{format_labels(labels)} {value}")
+            continue
+        groups = sorted({group for group, _ in histograms[name]})
+        for group in groups:
+            labels = json.loads(group)
+            cumulative = 0.0
+            for le in [str(le) for le in BUCKETS[name]] + [INF]:
+                cumulative += histograms[name].get((group, le), 0.0)
+                lines.append(f"{name}_bucket"
+                             f"{format_labels(dict(labels, le=le))} "
+                             f"{cumulative}")
+            for suffix in ("_sum", "_count"):
+                value = next((value for sample_labels, value
+                              in samples[name + suffix]
+                              if sample_labels == labels), 0.0)
+                lines.append(f"{name}{suffix}{format_labels(labels)} "
+                             f"{value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,156 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, profiling, timing
+from .db import routers
+
+logger = logging.getLogger("yatube.performance")
+
+# Метрики Server-Timing и подписи к числу замеров (заголовок — ASCII).
+SERVER_TIMINGS = (
+    ("db", "queries"),
+    ("template", "renders"),
+    ("thumbnail", "thumbnails"),
+)
+
+
+def query_timer(execute, sql, params, many, context):
+    with timing.measure("db"):
+        return execute(sql, params, many, context)
+
+
+class PerformanceMiddleware:
+    """Время запроса по частям: SQL, кеш, шаблоны и миниатюры.
+
+    Каждый запрос попадает в метрики /metrics. Для доли запросов
+    PERFORMANCE_SAMPLE_RATE дополнительно добавляется заголовок
+    Server-Timing и пишется строка JSON в лог yatube.performance.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = timing.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(query_timer))
+                response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - started
+            measured = timing.stop(token)
+        self.collect(request, response, measured, total)
+        if random.random() < settings.PERFORMANCE_SAMPLE_RATE:
+            self.report(request, response, measured, total)
+        return response
+
+    def collect(self, request, response, measured, total):
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        counts = measured.counts
+        metrics.inc("yatube_requests_total", view=view,
+                    method=request.method, status=response.status_code)
+        metrics.observe("yatube_request_duration_seconds", total, view=view)
+        metrics.observe("yatube_db_queries", counts["db"], view=view)
+        for result in ("hit", "miss"):
+            if counts[f"cache_{result}"]:
+                metrics.inc("yatube_cache_requests_total",
+                            counts[f"cache_{result}"], result=result)
+
+    def report(self, request, response, measured, total):
+        durations, counts = measured.durations, measured.counts
+        timings = [f"total;dur={total * 1000:.1f}"]
+        for name, description in SERVER_TIMINGS:
+            if counts[name]:
+                timings.append(
+                    f'{name};dur={durations[name] * 1000:.1f};'
+                    f'desc="{description}={counts[name]}"')
+        timings.append(
+            f'cache;desc="hit={counts["cache_hit"]} '
+            f'miss={counts["cache_miss"]}"')
+        response["Server-Timing"] = ", ".join(timings)
+        match = request.resolver_match
+        logger.info(json.dumps({
+            "view": match.view_name if match else None,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 2),
+            "db_queries": counts["db"],
+            "db_ms": round(durations["db"] * 1000, 2),
+            "cache_hits": counts["cache_hit"],
+            "cache_misses": counts["cache_miss"],
+            "template_ms": round(durations["template"] * 1000, 2),
+            "thumbnail_ms": round(durations["thumbnail"] * 1000, 2),
+        }, ensure_ascii=False))
+
+
+class ProfilingMiddleware:
+    """Стеки медленных запросов к представлениям из PROFILE_MODULES.
+
+    Стеки снимаются выборочно, без cProfile; в PROFILE_DIR попадают
+    только запросы дольше PROFILE_THRESHOLD секунд.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        token = getattr(request, "_profile", None)
+        if token is not None:
+            stacks = profiling.stop(token)
+            seconds = time.perf_counter() - request._profile_started
+            if stacks and seconds >= settings.PROFILE_THRESHOLD:
+                profiling.save(stacks, request.resolver_match.view_name,
+                               seconds)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (settings.PROFILE_THRESHOLD is not None
+                and view_func.__module__ in settings.PROFILE_MODULES):
+            request._profile_started = time.perf_counter()
+            request._profile = profiling.start()
+
+
+class ReplicaMiddleware:
+    """Читает свою запись: после записи запросы пользователя в течение
+    READ_YOUR_WRITES_SECONDS идут в основную базу.
+
+    Отметка хранится в cookie REPLICA_PIN_COOKIE как время окончания
+    окна, поэтому работает и для анонимных пользователей.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = routers.start(pinned=self.pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            state = routers.stop(token)
+        if state.wrote:
+            window = settings.READ_YOUR_WRITES_SECONDS
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, str(int(time.time() + window)),
+                max_age=window, httponly=True, samesite="Lax")
+        return response
+
+    def pinned(self, request):
+        if request.method not in ("GET", "HEAD", "OPTIONS"):
+            return True
+        try:
+            until = int(request.COOKIES.get(settings.REPLICA_PIN_COOKIE, 0))
+        except ValueError:
+            return False
+        return until > time.time()
@@ -0,0 +1,153 @@
+"""Выборочный профайлер медленных запросов.
+
+Один фоновый поток раз в PROFILE_INTERVAL секунд снимает стеки всех
+отслеживаемых запросов через sys._current_frames(); пока запросов нет,
+поток спит. Стеки запроса дольше PROFILE_THRESHOLD сохраняются в
+PROFILE_DIR в формате collapsed stacks («кадр;кадр;кадр число»),
+который открывают speedscope и flamegraph.pl.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+
+SUFFIX = ".folded"
+UNSAFE = re.compile(r"[^\w.-]+")
+
+
+def frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", code.co_filename)
+    return f"{module}:{code.co_name}"
+
+
+def collapse(frame):
+    """Стек кадра от корня до вершины в одну строку."""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Sampler(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks = {}
+        self.lock = threading.Lock()
+        self.active = threading.Event()
+
+    def add(self, thread_id):
+        with self.lock:
+            self.stacks[thread_id] = Counter()
+            self.active.set()
+
+    def remove(self, thread_id):
+        with self.lock:
+            stacks = self.stacks.pop(thread_id, Counter())
+            if not self.stacks:
+                self.active.clear()
+        return stacks
+
+    def run(self):
+        while True:
+            self.active.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, stacks in self.stacks.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[collapse(frame)] += 1
+            del frames
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def sampler():
+    global _sampler
+    if _sampler is None or _sampler.interval != settings.PROFILE_INTERVAL:
+        with _sampler_lock:
+            if (_sampler is None
+                    or _sampler.interval != settings.PROFILE_INTERVAL):
+                _sampler = Sampler(settings.PROFILE_INTERVAL)
+                _sampler.start()
+    return _sampler
+
+
+def start():
+    """Начинает снимать стеки текущего потока; возвращает токен."""
+    thread_id = threading.get_ident()
+    profiler = sampler()
+    profiler.add(thread_id)
+    return profiler, thread_id
+
+
+def stop(token):
+    profiler, thread_id = token
+    return profiler.remove(thread_id)
+
+
+def profile_name(view_name, seconds):
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    view = UNSAFE.sub("_", view_name.replace(":", "."))
+    unique = uuid.uuid4().hex[:8]
+    return f"{stamp}-{view}-{round(seconds * 1000)}ms-{unique}{SUFFIX}"
+
+
+def save(stacks, view_name, seconds):
+    """Записывает стеки в PROFILE_DIR и возвращает путь к файлу."""
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    path = os.path.join(settings.PROFILE_DIR,
+                        profile_name(view_name, seconds))
+    with open(path, "w", encoding="utf-8") as file:
+        for stack, count in stacks.most_common():
+            file.write(f"{stack} {count}\n")
+    return path
+
+
+def read(path):
+    stacks = Counter()
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                stacks[stack] += int(count)
+    return stacks
+
+
+def speedscope(stacks, name, interval):
+    """Профиль в формате speedscope: вес выборки — в миллисекундах."""
+    frames, indexes, samples, weights = [], {}, [], []
+    for stack, count in stacks.most_common():
+        sample = []
+        for frame in stack.split(";"):
+            if frame not in indexes:
+                indexes[frame] = len(frames)
+                frames.append({"name": frame})
+            sample.append(indexes[frame])
+        samples.append(sample)
+        weights.append(count * interval * 1000)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": name,
+        "exporter": "yatube",
+    }
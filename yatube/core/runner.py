@@ -0,0 +1,57 @@
+"""Тесты пишут кеш, метрики, профили, медиа и журналы во временный
+каталог: cache.clear() в тестах не трогает кеш запущенного сервера,
+а страницы прошлого прогона не попадают в следующий.
+
+TestRunner подключает это для manage.py test, conftest.py — для pytest.
+"""
+import copy
+import logging.config
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+def isolate():
+    """Переносит файлы тестов во временный каталог; вернёт его для
+    restore()."""
+    directory = tempfile.mkdtemp(prefix="yatube-tests-")
+    caches = copy.deepcopy(settings.CACHES)
+    for alias, options in caches.items():
+        if "LOCATION" in options:
+            options["LOCATION"] = os.path.join(directory,
+                                               f"cache-{alias}.sqlite3")
+    config = copy.deepcopy(settings.LOGGING)
+    for handler in config.get("handlers", {}).values():
+        if "filename" in handler:
+            handler["filename"] = os.path.join(
+                directory, os.path.basename(handler["filename"]))
+    isolation = override_settings(
+        CACHES=caches,
+        LOGGING=config,
+        MEDIA_ROOT=os.path.join(directory, "media"),
+        METRICS_DIR=os.path.join(directory, "metrics"),
+        PROFILE_DIR=os.path.join(directory, "profiles"),
+    )
+    isolation.enable()
+    logging.config.dictConfig(settings.LOGGING)
+    return directory, isolation
+
+
+def restore(directory, isolation):
+    isolation.disable()
+    logging.config.dictConfig(settings.LOGGING)
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.isolation = isolate()
+
+    def teardown_test_environment(self, **kwargs):
+        restore(*self.isolation)
+        super().teardown_test_environment(**kwargs)
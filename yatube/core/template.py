@@ -0,0 +1,24 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import timing
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timing.measure("template"):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблоны Django, время отрисовки которых попадает в метрики запроса.
+
+    Меряется только отрисовка шаблона целиком, вложенные include входят
+    в неё.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
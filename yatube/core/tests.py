@@ -0,0 +1,276 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import (SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+
+from posts.models import Post, User
+
+from . import metrics, timing
+from .cache import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, "cache.sqlite3")
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        options.setdefault("L1_MAX_ENTRIES", 0)
+        return SQLiteCache(self.location, {"OPTIONS": options})
+
+    def test_set_get_delete(self):
+        """Значения сохраняются и удаляются."""
+        self.cache.set("key", {"text": "значение"})
+        self.assertEqual(self.cache.get("key"), {"text": "значение"})
+        self.cache.delete("key")
+        self.assertIsNone(self.cache.get("key"))
+
+    def test_expired_value(self):
+        """Просроченная запись не возвращается и может быть добавлена."""
+        self.cache.set("key", "старое", timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get("key"))
+        self.assertTrue(self.cache.add("key", "новое"))
+        self.assertFalse(self.cache.add("key", "другое"))
+        self.assertEqual(self.cache.get("key"), "новое")
+
+    def test_shared_between_instances(self):
+        """Разные экземпляры (процессы) видят один и тот же кеш."""
+        self.cache.set("key", "значение")
+        self.assertEqual(self.make_cache().get("key"), "значение")
+
+    def test_incr_is_atomic(self):
+        """incr из разных потоков и экземпляров не теряет приращений."""
+        self.cache.set("counter", 0)
+
+        def work():
+            cache = self.make_cache()
+            for _ in range(50):
+                cache.incr("counter")
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get("counter"), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+    def test_lru_eviction(self):
+        """При превышении MAX_BYTES вытесняются давно не читанные ключи."""
+        cache = self.make_cache(MAX_BYTES=5000)
+        cache.set("hot", "x" * 1000)
+        for number in range(10):
+            cache.set(f"cold{number}", "x" * 1000)
+        self.assertIsNone(cache.get("cold0"))
+        self.assertIsNotNone(cache.get("cold9"))
+
+    def test_l1_keeps_value_but_not_counters(self):
+        """L1 отдаёт горячие значения, но счётчики читает из файла."""
+        cache = self.make_cache(L1_MAX_ENTRIES=10, L1_TIMEOUT=60)
+        other = self.make_cache()
+        # У другого процесса своя память: отделяем его L1 от нашего.
+        other._l1 = OrderedDict()
+        other._l1_lock = threading.Lock()
+        cache.set("value", "старое")
+        cache.set("version", 1)
+        cache.get("value")
+        cache.get("version")
+        other.set("value", "новое")
+        other.incr("version")
+        self.assertEqual(cache.get("value"), "старое")
+        self.assertEqual(cache.get("version"), 2)
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_and_log(self):
+        """Метрики запроса попадают в Server-Timing и в лог."""
+        with self.assertLogs("yatube.performance") as logs:
+            response = self.client.get("/")
+        header = response["Server-Timing"]
+        for metric in ("total;dur=", "db;dur=", 'desc="queries=',
+                       "template;dur=", 'cache;desc="hit='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "posts:index")
+        self.assertEqual(record["status"], 200)
+        self.assertGreater(record["db_queries"], 0)
+        self.assertGreater(record["cache_misses"], 0)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        """Запросы вне выборки не замеряются."""
+        response = self.client.get("/")
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    def test_record_outside_request(self):
+        """Вне запроса замеры ничего не делают."""
+        with timing.measure("thumbnail"):
+            timing.incr("cache_hit")
+        token = timing.start()
+        timing.incr("cache_hit", 2)
+        metrics = timing.stop(token)
+        self.assertEqual(metrics.counts["cache_hit"], 2)
+
+
+class SQLiteBackendTests(TestCase):
+    def test_pragmas(self):
+        """При подключении применяются прагмы из PRAGMAS."""
+        expected = {"synchronous": 1, "busy_timeout": 5000,
+                    "cache_size": -64 * 1024, "temp_store": 2}
+        with connection.cursor() as cursor:
+            for name, value in expected.items():
+                with self.subTest(pragma=name):
+                    cursor.execute(f"PRAGMA {name}")
+                    self.assertEqual(cursor.fetchone()[0], value)
+
+
+class ReplicaRouterTests(TransactionTestCase):
+    def setUp(self):
+        # Реплика — отдельный файл SQLite, а не зеркало тестовой базы.
+        self.directory = tempfile.mkdtemp()
+        connections.databases["replica"] = dict(
+            connection.settings_dict,
+            NAME=os.path.join(self.directory, "replica.sqlite3"))
+        # Настоящий кеш страниц: он общий для читающих с реплики и
+        # из основной базы.
+        settings = override_settings(
+            DATABASE_REPLICAS=["replica"],
+            CACHES={"default": {
+                "BACKEND": "core.cache.SQLiteCache",
+                "LOCATION": os.path.join(self.directory, "cache.sqlite3"),
+            }})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.addCleanup(self.remove_replica)
+        self.author = User.objects.create_user(username="author")
+        Post.objects.create(author=self.author, text="Старый пост")
+        call_command("sync_replicas", stdout=StringIO())
+        self.client.force_login(self.author)
+
+    def remove_replica(self):
+        connections["replica"].close()
+        delattr(connections._connections, "replica")
+        del connections.databases["replica"]
+
+    def test_read_your_writes(self):
+        """Автор сразу видит свой пост, остальные — после синхронизации."""
+        guest = self.client_class()
+        self.assertContains(guest.get("/"), "Старый пост")
+        response = self.client.post("/create/", {"text": "Новый пост"})
+        self.assertIn("primary_until", response.cookies)
+        self.assertContains(self.client.get("/"), "Новый пост")
+        self.assertNotContains(guest.get("/"), "Новый пост")
+        call_command("sync_replicas", stdout=StringIO())
+        self.assertContains(guest.get("/"), "Новый пост")
+
+    def test_cached_page_from_replica(self):
+        """Страница, собранная по реплике, не попадает к автору записи."""
+        reader = User.objects.create_user(username="reader")
+        call_command("sync_replicas", stdout=StringIO())
+        reader_client = self.client_class()
+        reader_client.force_login(reader)
+        self.client.post("/create/", {"text": "Новый пост"})
+        self.assertNotContains(reader_client.get("/"), "Новый пост")
+        self.assertContains(self.client.get("/"), "Новый пост")
+        call_command("sync_replicas", stdout=StringIO())
+        self.assertContains(reader_client.get("/"), "Новый пост")
+
+    def test_pin_expires(self):
+        """По окончании окна чтение снова идёт с реплики."""
+        Post.objects.create(author=self.author, text="Новый пост")
+        self.client.cookies["primary_until"] = str(int(time.time()) + 60)
+        self.assertContains(self.client.get("/"), "Новый пост")
+        self.client.cookies["primary_until"] = str(int(time.time()) - 1)
+        response = self.client.get("/")
+        self.assertNotContains(response, "Новый пост")
+        self.assertEqual(response.wsgi_request.user, self.author)
+
+
+def increment_in_child(amount):
+    metrics.inc("yatube_objects_created_total", amount, model="post")
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        settings = override_settings(METRICS_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_store_grows_and_reopens(self):
+        """Файл растёт по мере добавления ключей и читается заново."""
+        path = os.path.join(self.directory, "metrics-1.db")
+        store = metrics.MmapStore(path)
+        for number in range(5000):
+            store.inc(f"key{number}", number)
+        store.inc("key7", 0.5)
+        self.assertGreater(os.path.getsize(path), metrics.INITIAL_SIZE)
+        reopened = metrics.MmapStore(path)
+        reopened.inc("key7")
+        totals = metrics.collect()
+        self.assertEqual(totals["key7"], 8.5)
+        self.assertEqual(totals["key4999"], 4999)
+
+    def test_processes_are_summed(self):
+        """Значения разных процессов складываются, а не затираются."""
+        metrics.inc("yatube_objects_created_total", model="post")
+        context = multiprocessing.get_context("fork")
+        with context.Pool(2) as pool:
+            pool.map(increment_in_child, [2, 3])
+        self.assertGreater(len(os.listdir(self.directory)), 1)
+        key = metrics.make_key("yatube_objects_created_total",
+                               {"model": "post"})
+        self.assertEqual(metrics.collect()[key], 6)
+
+    def test_endpoint(self):
+        """/metrics отдаёт запросы по имени адреса, SQL, кеш и созданное."""
+        author = User.objects.create_user(username="author")
+        Post.objects.create(author=author, text="Текст")
+        self.client.get("/")
+        self.client.get("/")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        text = response.content.decode()
+        for line in (
+            'yatube_requests_total{method="GET",status="200",'
+            'view="posts:index"} 2.0',
+            'yatube_request_duration_seconds_bucket'
+            '{le="+Inf",view="posts:index"} 2.0',
+            'yatube_request_duration_seconds_count{view="posts:index"} 2.0',
+            'yatube_db_queries_count{view="posts:index"} 2.0',
+            'yatube_objects_created_total{model="post"} 1.0',
+            "yatube_cache_hit_ratio ",
+            'yatube_cache_requests_total{result="hit"}',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, text)
+
+    def test_endpoint_is_internal(self):
+        """С чужого адреса метрики недоступны."""
+        response = self.client.get("/metrics", REMOTE_ADDR="203.0.113.5")
+        self.assertEqual(response.status_code, 403)
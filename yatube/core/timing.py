@@ -0,0 +1,50 @@
+"""Сбор метрик текущего запроса: длительности и счётчики по имени.
+
+Пока PerformanceMiddleware не начала сбор, record() и incr() ничего
+не делают, поэтому их можно вызывать из любого кода.
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_metrics = ContextVar("request_metrics", default=None)
+
+
+class Metrics:
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+
+
+def start():
+    """Начинает сбор метрик; возвращает токен для stop()."""
+    return _metrics.set(Metrics())
+
+
+def stop(token):
+    metrics = _metrics.get()
+    _metrics.reset(token)
+    return metrics
+
+
+def record(name, seconds):
+    metrics = _metrics.get()
+    if metrics is not None:
+        metrics.durations[name] += seconds
+        metrics.counts[name] += 1
+
+
+def incr(name, delta=1):
+    metrics = _metrics.get()
+    if metrics is not None:
+        metrics.counts[name] += delta
+
+
+@contextmanager
+def measure(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Post, Group, Comment, Follow
+from .search import find_posts
 
 
 @admin.register(Post)
@@ -10,6 +11,13 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по индексу вместо LIKE '%...%' по всей таблице.
+        if not search_term:
+            return queryset, False
+        return queryset.filter(
+            pk__in=find_posts(search_term).values("pk")), False
+
 
 admin.site.register(Group)
 admin.site.register(Comment)
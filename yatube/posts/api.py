@@ -0,0 +1,140 @@
+"""JSON-версии лент для мобильных клиентов, только чтение.
+
+Страницы листаются курсором (?cursor=), поля выбираются параметром
+?fields=id,text,... . ETag строится из поколений данных кеша фрагментов,
+поэтому повторный запрос неизменной ленты получает короткий ответ 304.
+Last-Modified не отдаётся: правка поста, новый комментарий или удаление
+не меняют дат публикации, а точности в секунду не хватает.
+"""
+import hashlib
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+
+from .caching import POSTS_SCOPE, follow_scope, generation
+from .feed import FEED_ORDERING, FeedPaginator, feed_sources
+from .models import Group, Post, User
+from .utils import LIMIT_POSTS_ON_BOARD, CursorPaginator
+from .views import comment_data, comments_page
+
+POST_FIELDS = ("id", "text", "pub_date", "author", "group", "image",
+               "thumbnail", "comment_count", "url")
+MAX_LIMIT: int = 50
+
+
+def post_etag(request, **kwargs):
+    """ETag меняется при любой записи в посты, группы и подписки."""
+    parts = [request.get_full_path()]
+    scopes = [POSTS_SCOPE]
+    if request.resolver_match.url_name == "api_follow":
+        if not request.user.is_authenticated:
+            return None
+        # Ленты подписок разных пользователей не делят ETag.
+        parts.append(str(request.user.pk))
+        scopes.append(follow_scope(request.user.pk))
+    parts.extend(str(generation(scope)) for scope in scopes)
+    return hashlib.sha1(":".join(parts).encode()).hexdigest()
+
+
+def api_view(view):
+    """GET/HEAD с условными ответами; клиент всегда перепроверяет кеш."""
+    view = condition(etag_func=post_etag)(view)
+    return require_safe(cache_control(private=True, no_cache=True)(view))
+
+
+def error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+def selected_fields(request):
+    """Запрошенные поля поста или None, если среди них есть неизвестные."""
+    fields = request.GET.get("fields")
+    if not fields:
+        return POST_FIELDS
+    fields = tuple(name.strip() for name in fields.split(",") if name)
+    if not set(fields) <= set(POST_FIELDS):
+        return None
+    return fields
+
+
+def serialize_post(post, fields):
+    values = {
+        "id": lambda: post.pk,
+        "text": lambda: post.text,
+        "pub_date": lambda: post.pub_date.isoformat(),
+        "author": lambda: {
+            "username": post.author.username,
+            "full_name": post.author.get_full_name(),
+        },
+        "group": lambda: post.group and {
+            "slug": post.group.slug,
+            "title": post.group.title,
+        },
+        "image": lambda: post.image.url if post.image else None,
+        "thumbnail": lambda: post.thumbnail.url if post.thumbnail else None,
+        "comment_count": lambda: post.comment_count,
+        "url": lambda: reverse("posts:api_post", args=(post.pk,)),
+    }
+    return {name: values[name]() for name in fields}
+
+
+def page_response(request, queryset, ordering=None,
+                  paginator_class=CursorPaginator):
+    fields = selected_fields(request)
+    if fields is None:
+        return error(f"Доступные поля: {', '.join(POST_FIELDS)}")
+    try:
+        limit = min(int(request.GET.get("limit", LIMIT_POSTS_ON_BOARD)),
+                    MAX_LIMIT)
+    except ValueError:
+        return error("limit должен быть числом")
+    paginator = paginator_class(queryset, max(limit, 1), ordering)
+    page = paginator.get_page(cursor=request.GET.get("cursor"))
+    return JsonResponse({
+        "results": [serialize_post(post, fields) for post in page],
+        "next": paginator.next_cursor,
+        "previous": paginator.previous_cursor,
+    })
+
+
+@api_view
+def index(request):
+    return page_response(request, Post.objects.for_feed())
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return page_response(request, group.posts.for_feed())
+
+
+@api_view
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return page_response(request, author.posts.for_feed())
+
+
+@api_view
+def post_detail(request, post_id):
+    fields = selected_fields(request)
+    if fields is None:
+        return error(f"Доступные поля: {', '.join(POST_FIELDS)}")
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    comments = comments_page(post, request.GET.get("comments"))
+    data = serialize_post(post, fields)
+    data["comments"] = {
+        "results": [comment_data(comment) for comment in comments],
+        "next": comments.paginator.next_cursor,
+    }
+    return JsonResponse(data)
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error("Нужна авторизация", status=401)
+    return page_response(request, feed_sources(request.user),
+                         FEED_ORDERING, FeedPaginator)
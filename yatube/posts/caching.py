@@ -0,0 +1,88 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone, translation
+
+from core.db import routers
+
+FRAGMENT_CACHE_TIMEOUT: int = 60 * 60 * 6
+GENERATION_KEY: str = "posts:generation:{}"
+POST_FRAGMENT_KEY: str = "posts:one_post:{}:{}"
+POSTS_SCOPE: str = "posts"
+
+
+def follow_scope(user_id):
+    return f"follow:{user_id}"
+
+
+def generation(scope):
+    """Текущее поколение данных, входящее в ключи фрагментов."""
+    key = GENERATION_KEY.format(scope)
+    value = cache.get(key)
+    if value is None:
+        # Начальное значение берём из времени: если ключ вытеснили из
+        # кеша, новые ключи фрагментов не совпадут со старыми.
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def bump_generation(scope):
+    """Делает недействительными все фрагменты, зависящие от scope."""
+    try:
+        cache.incr(GENERATION_KEY.format(scope))
+    except ValueError:
+        generation(scope)
+
+
+def bump_on_commit(scope):
+    """bump_generation для записи, которая может быть внутри транзакции.
+
+    Пока транзакция не завершена, другой запрос может собрать страницу
+    по старым данным уже под новым поколением, поэтому после фиксации
+    поколение сдвигается ещё раз.
+    """
+    bump_generation(scope)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_generation(scope))
+
+
+def fragment_context(request, *scopes, per_user=False):
+    """Таймаут и ключ фрагмента ленты для тега {% cache %}."""
+    parts = [
+        request.GET.get("cursor", ""),
+        request.GET.get("page", ""),
+        request.user.pk if per_user else request.user.is_authenticated,
+        # Реплика может отставать: собранное по ней не отдаём тем, кто
+        # должен видеть свою запись.
+        "replica" if routers.reads_replica() else "primary",
+    ]
+    parts.extend(generation(scope) for scope in (POSTS_SCOPE,) + scopes)
+    return {
+        "cache_timeout": FRAGMENT_CACHE_TIMEOUT,
+        "cache_key": ":".join(str(part) for part in parts),
+    }
+
+
+def post_version(post):
+    """Отпечаток всего, что показывает includes/one_post.html.
+
+    Меняется при правке поста, смене имени автора, нового числа
+    комментариев или готовой миниатюре — даже если запись сделана
+    через update() в обход сигналов.
+    """
+    author = post.author
+    parts = (
+        post.text, post.pub_date.isoformat(), post.image.name or "",
+        post.thumbnail.name or "", post.comment_count, author.username,
+        author.first_name, author.last_name, translation.get_language(),
+        timezone.get_current_timezone_name(),
+    )
+    digest = hashlib.sha1("\0".join(map(str, parts)).encode())
+    return digest.hexdigest()[:16]
+
+
+def post_fragment_key(post):
+    return POST_FRAGMENT_KEY.format(post.pk, post_version(post))
@@ -0,0 +1,122 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import (AuthorStats, Comment, Follow, Group, ImageBlob, Post,
+                     User)
+
+COUNTERS = (
+    (Group, "post_count", Post, "group"),
+    (Post, "comment_count", Comment, "post"),
+    (AuthorStats, "post_count", Post, "author"),
+    (AuthorStats, "follower_count", Follow, "author"),
+    (AuthorStats, "following_count", Follow, "user"),
+    (ImageBlob, "ref_count", Post, "image"),
+)
+REPAIR_BATCH_SIZE: int = 500
+
+
+def bump(model, pk, **deltas):
+    """Атомарно сдвигает счётчики строки, не опуская их ниже нуля."""
+    queryset = model.objects.filter(pk=pk)
+    for name, delta in deltas.items():
+        if delta < 0:
+            queryset = queryset.filter(**{f"{name}__gte": -delta})
+    return queryset.update(
+        **{name: F(name) + delta for name, delta in deltas.items()})
+
+
+def bump_author(user_id, **deltas):
+    """Как bump, но заводит счётчики пользователя при первом росте."""
+    updated = bump(AuthorStats, user_id, **deltas)
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        recount_author(user_id)
+
+
+def recount_author(user_id):
+    stats, _ = AuthorStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            "post_count": Post.objects.filter(author_id=user_id).count(),
+            "follower_count": Follow.objects.filter(
+                author_id=user_id).count(),
+            "following_count": Follow.objects.filter(
+                user_id=user_id).count(),
+        },
+    )
+    return stats
+
+
+def author_stats(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return recount_author(user.pk)
+
+
+def bump_image(name, delta):
+    """Сдвигает число постов с картинкой; заводит запись при первом росте."""
+    if not name:
+        return
+    updated = bump(ImageBlob, name, ref_count=delta)
+    if not updated and delta > 0:
+        ImageBlob.objects.update_or_create(
+            name=name,
+            defaults={"ref_count": Post.objects.filter(image=name).count()},
+        )
+
+
+def counter_expression(source, field):
+    """Фактическое значение счётчика для строки внешнего запроса."""
+    return Coalesce(
+        Subquery(
+            source.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def repair_counters(dry_run=False):
+    """Сверяет все счётчики с данными и исправляет расхождения.
+
+    Возвращает число расходящихся строк по каждому счётчику.
+    """
+    if not dry_run:
+        AuthorStats.objects.bulk_create(
+            [
+                AuthorStats(user_id=pk)
+                for pk in User.objects.filter(
+                    stats__isnull=True).values_list("pk", flat=True)
+            ],
+            batch_size=REPAIR_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        ImageBlob.objects.bulk_create(
+            [
+                ImageBlob(name=name)
+                for name in Post.objects.exclude(image="").exclude(
+                    image__in=ImageBlob.objects.values("name"),
+                ).order_by().values_list("image", flat=True).distinct()
+            ],
+            batch_size=REPAIR_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+    drift = {}
+    for model, name, source, field in COUNTERS:
+        expected = counter_expression(source, field)
+        pks = list(
+            model.objects.annotate(expected=expected)
+            .exclude(**{name: F("expected")})
+            .values_list("pk", flat=True)
+        )
+        drift[f"{model.__name__}.{name}"] = len(pks)
+        if dry_run:
+            continue
+        for start in range(0, len(pks), REPAIR_BATCH_SIZE):
+            model.objects.filter(
+                pk__in=pks[start:start + REPAIR_BATCH_SIZE]
+            ).update(**{name: expected})
+    return drift
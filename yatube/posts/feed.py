@@ -0,0 +1,147 @@
+import heapq
+
+from django.conf import settings
+from django.db.models import F
+from django.utils.functional import cached_property
+
+from .models import AuthorStats, FeedEntry, Follow, Post
+from .utils import CursorPaginator
+
+FEED_ORDERING = ("-feed_date", "-feed_id")
+FEED_BATCH_SIZE: int = 500
+
+
+def is_celebrity(author_id):
+    """Автор со слишком большим числом подписчиков для рассылки."""
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        follower_count__gte=settings.FEED_CELEBRITY_FOLLOWERS,
+    ).exists()
+
+
+def celebrity_ids(user):
+    """Авторы из подписок пользователя, чьи посты читаются напрямую."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__follower_count__gte=(
+                settings.FEED_CELEBRITY_FOLLOWERS),
+        ).values_list("author_id", flat=True)
+    )
+
+
+def push_post(post):
+    """Разносит новый пост по лентам подписчиков обычного автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list("user_id", flat=True)
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post=post, author_id=post.author_id,
+                      pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ],
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика все посты нового автора."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        "id", "pub_date")
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post_id=post_id, author_id=author_id,
+                      pub_date=pub_date)
+            for post_id, pub_date in posts.iterator()
+        ],
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    if AuthorStats.objects.filter(
+            user_id=author_id,
+            follower_count=settings.FEED_CELEBRITY_FOLLOWERS - 1).exists():
+        # Автор перестал быть знаменитостью: его посты, которые раньше
+        # читались напрямую, нужно разослать оставшимся подписчикам.
+        followers = Follow.objects.filter(author_id=author_id)
+        for follower_id in followers.values_list("user_id", flat=True):
+            backfill(follower_id, author_id)
+
+
+def rebuild():
+    """Заново заполняет ленты по текущим подпискам и счётчикам."""
+    FeedEntry.objects.all().delete()
+    follows = Follow.objects.values_list("user_id", "author_id")
+    for user_id, author_id in follows.iterator():
+        backfill(user_id, author_id)
+
+
+def feed_sources(user):
+    """Разосланные посты и посты знаменитостей из подписок."""
+    celebrities = celebrity_ids(user)
+    pushed = (
+        Post.objects.for_feed()
+        .filter(feed_entries__user=user)
+        .exclude(author_id__in=celebrities)
+        .annotate(feed_date=F("feed_entries__pub_date"),
+                  feed_id=F("feed_entries__post"))
+    )
+    pulled = (
+        Post.objects.for_feed()
+        .filter(author_id__in=celebrities)
+        .annotate(feed_date=F("pub_date"), feed_id=F("id"))
+    )
+    return [pushed, pulled]
+
+
+class FeedPaginator(CursorPaginator):
+    """Курсорный вывод нескольких источников как одной ленты.
+
+    Каждый источник читается по ключу отдельно, а страница собирается
+    слиянием уже отсортированных выборок.
+    """
+
+    def __init__(self, sources, per_page, ordering=None, **kwargs):
+        super().__init__(sources[0], per_page, ordering, **kwargs)
+        self.sources = [source.order_by(*self.ordering)
+                        for source in sources]
+
+    @cached_property
+    def count(self):
+        return sum(source.count() for source in self.sources)
+
+    def page(self, number):
+        """Страница по номеру: OFFSET над слиянием всех источников."""
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        items = self.fetch(None, True, top)[bottom:]
+        return self._get_page(items, number, self)
+
+    def fetch(self, values, forward, limit):
+        descending = self.ordering[0].startswith("-")
+        chunks = []
+        for source in self.sources:
+            queryset = source
+            if values is not None:
+                queryset = queryset.filter(self.seek_filter(values, forward))
+            if not forward:
+                queryset = queryset.reverse()
+            chunks.append(list(queryset[:limit]))
+        merged = heapq.merge(
+            *chunks,
+            key=lambda obj: tuple(getattr(obj, name) for name in self.fields),
+            reverse=descending == forward,
+        )
+        return list(merged)[:limit]
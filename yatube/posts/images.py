@@ -0,0 +1,74 @@
+"""Приём картинок постов: проверка, уменьшение и пересжатие при загрузке.
+
+Загрузка пишется на диск кусками (TemporaryFileUploadHandler), размер
+кадра проверяется по заголовку до декодирования, поэтому
+«бомба распаковки» отклоняется, не заняв память. В хранилище попадает
+только уменьшенная до POST_IMAGE_MAX_SIDE копия без EXIF — её и читают
+миниатюры и страницы.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+FORMAT: str = "WEBP" if features.check("webp") else "JPEG"
+EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg"}
+QUALITY: int = 85
+BACKGROUND = (255, 255, 255)
+
+
+def open_checked(upload):
+    """Открывает картинку, прочитав только заголовок, и проверяет размеры."""
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            "Файл больше %(limit)d МБ.",
+            params={"limit": settings.POST_IMAGE_MAX_BYTES // 2 ** 20},
+            code="too_large")
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError("Загрузите правильное изображение.",
+                              code="invalid_image")
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            "Изображение слишком большое: %(width)d×%(height)d.",
+            params={"width": width, "height": height}, code="too_many_pixels")
+    return image
+
+
+def flatten(image):
+    """RGB-кадр; прозрачность заливается белым фоном для JPEG."""
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        if FORMAT == "WEBP":
+            return image
+        background = Image.new("RGB", image.size, BACKGROUND)
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def normalize(upload):
+    """Уменьшенная и пересжатая копия загрузки без метаданных."""
+    image = open_checked(upload)
+    side = settings.POST_IMAGE_MAX_SIDE
+    # JPEG декодируется сразу в уменьшенном масштабе.
+    image.draft("RGB", (side, side))
+    try:
+        image = ImageOps.exif_transpose(image)
+        image = flatten(image)
+    except (OSError, SyntaxError, ValueError):
+        raise ValidationError("Загрузите правильное изображение.",
+                              code="invalid_image")
+    image.thumbnail((side, side), Image.LANCZOS)
+    buffer = BytesIO()
+    # Без exif= и icc_profile= метаданные в новый файл не попадают.
+    image.save(buffer, FORMAT, quality=QUALITY, optimize=True,
+               progressive=True)
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return ContentFile(buffer.getvalue(), name=stem + EXTENSIONS[FORMAT])
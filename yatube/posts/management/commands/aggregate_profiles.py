@@ -0,0 +1,56 @@
+import glob
+import json
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = ("Объединяет профили медленных запросов в один flame graph: "
+            "collapsed stacks или speedscope (.json)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*",
+                            help="Файлы профилей, по умолчанию все "
+                                 "из PROFILE_DIR")
+        parser.add_argument("-o", "--output", required=True,
+                            help="Итоговый файл; .json — формат speedscope")
+        parser.add_argument("--view",
+                            help="Только профили адреса, например "
+                                 "posts:index")
+        parser.add_argument("--top", type=int, default=15,
+                            help="Сколько самых частых функций показать")
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or sorted(glob.glob(os.path.join(
+            settings.PROFILE_DIR, f"*{profiling.SUFFIX}")))
+        if options["view"]:
+            view = options["view"].replace(":", ".")
+            paths = [path for path in paths
+                     if f"-{view}-" in os.path.basename(path)]
+        if not paths:
+            raise CommandError("Нет профилей для объединения")
+        stacks = Counter()
+        for path in paths:
+            stacks.update(profiling.read(path))
+        output = options["output"]
+        with open(output, "w", encoding="utf-8") as file:
+            if output.endswith(".json"):
+                json.dump(profiling.speedscope(
+                    stacks, options["view"] or "yatube",
+                    settings.PROFILE_INTERVAL), file)
+            else:
+                for stack, count in stacks.most_common():
+                    file.write(f"{stack} {count}\n")
+        total = sum(stacks.values())
+        self.stdout.write(f"Профилей: {len(paths)}, выборок: {total}, "
+                          f"файл: {output}")
+        own = Counter()
+        for stack, count in stacks.items():
+            own[stack.rsplit(";", 1)[-1]] += count
+        for frame, count in own.most_common(options["top"]):
+            self.stdout.write(f"{count / total:7.1%}  {frame}")
@@ -0,0 +1,167 @@
+import io
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+from django.utils import timezone
+
+from posts.models import Follow, Post, User
+
+PERCENTILES = (50, 95, 99)
+VIEWS = ("index", "profile", "post_detail", "follow_index")
+
+
+def percentile(values, rank):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    if not values:
+        return None
+    index = max(math.ceil(rank / 100 * len(values)) - 1, 0)
+    return values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+    }
+    for rank in PERCENTILES:
+        value = percentile(latencies, rank)
+        summary[f"p{rank}_ms"] = (round(value * 1000, 2)
+                                  if value is not None else None)
+    return summary
+
+
+class Command(BaseCommand):
+    help = ("Нагружает ленты через WSGI-приложение в нескольких потоках "
+            "и выводит задержки и RPS в JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000,
+                            help="Общее число запросов")
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--warmup", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Файл для JSON-отчёта")
+        parser.add_argument(
+            "--compare",
+            help="Отчёт прошлого прогона для сравнения p95 и RPS",
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.application = get_wsgi_application()
+        self.prepare_samples()
+        plan = [self.random.choice(VIEWS) for _ in range(options["requests"])]
+        for view in plan[:options["warmup"]]:
+            self.call(view)
+        results = {view: [] for view in VIEWS}
+        errors = {view: 0 for view in VIEWS}
+        lock = threading.Lock()
+
+        def work(view):
+            started = time.perf_counter()
+            status = self.call(view)
+            latency = time.perf_counter() - started
+            with lock:
+                results[view].append(latency)
+                if status >= 400:
+                    errors[view] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            list(pool.map(work, plan))
+        elapsed = time.perf_counter() - started
+        report = {
+            "finished": timezone.now().isoformat(),
+            "threads": options["threads"],
+            "views": {
+                view: summarize(results[view], errors[view], elapsed)
+                for view in VIEWS
+            },
+            "total": summarize(
+                [latency for view in VIEWS for latency in results[view]],
+                sum(errors.values()), elapsed,
+            ),
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(output + "\n")
+        self.stdout.write(output)
+        if options["compare"]:
+            self.compare(report, options["compare"])
+
+    def prepare_samples(self):
+        follow = Follow.objects.order_by("?").first()
+        post_ids = list(Post.objects.values_list("id", flat=True)[:1000])
+        if follow is None or not post_ids:
+            raise CommandError(
+                "Нет данных для нагрузки: запустите generate_data")
+        client = Client()
+        client.force_login(follow.user)
+        self.session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.usernames = list(User.objects.filter(
+            stats__post_count__gt=0).values_list("username", flat=True)[:1000])
+        self.post_ids = post_ids
+
+    def url(self, view):
+        if view == "profile":
+            return f"/profile/{self.random.choice(self.usernames)}/"
+        if view == "post_detail":
+            return f"/posts/{self.random.choice(self.post_ids)}/"
+        if view == "follow_index":
+            return "/follow/"
+        return "/"
+
+    def call(self, view):
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": self.url(view),
+            "QUERY_STRING": "",
+            "SERVER_NAME": "testserver",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_COOKIE": f"{settings.SESSION_COOKIE_NAME}={self.session}",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(),
+            "wsgi.errors": io.StringIO(),
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(int(status.split()[0]))
+
+        response = self.application(environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            if hasattr(response, "close"):
+                response.close()
+        return statuses[0]
+
+    def compare(self, report, path):
+        with open(path, encoding="utf-8") as file:
+            previous = json.load(file)
+        for view, summary in report["views"].items():
+            before = previous["views"].get(view)
+            if not before or not before["p95_ms"] or not summary["p95_ms"]:
+                continue
+            self.stdout.write(
+                f"{view}: p95 {before['p95_ms']} → {summary['p95_ms']} мс "
+                f"({(summary['p95_ms'] / before['p95_ms'] - 1) * 100:+.1f}%),"
+                f" RPS {before['rps']} → {summary['rps']}"
+            )
@@ -0,0 +1,134 @@
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.utils import OperationalError, load_backend
+
+from posts.models import Post
+
+from .benchmark import summarize
+
+# Исходный бэкенд с соединением на каждый запрос и настроенный
+# с постоянными соединениями.
+CONFIGURATIONS = (
+    ("stock", "django.db.backends.sqlite3", 0),
+    ("tuned", "core.db.sqlite3", None),
+)
+WRITE_SQL = ("UPDATE posts_post SET comment_count = comment_count "
+             "WHERE id = %s")
+
+
+class Command(BaseCommand):
+    help = ("Сравнивает пропускную способность чтения лент и записи "
+            "постов на копиях базы со штатным и настроенным SQLite")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=10,
+                            help="Длительность каждого прогона")
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--writers", type=int, default=1)
+        parser.add_argument("--output", help="Файл для JSON-отчёта")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Сравнение имеет смысл только для SQLite")
+        if connection.in_atomic_block:
+            # Копия через backup() не завершается при открытой транзакции.
+            raise CommandError("Запустите команду вне транзакции")
+        self.post_ids = list(
+            Post.objects.values_list("id", flat=True)[:1000])
+        if not self.post_ids:
+            raise CommandError(
+                "Нет данных для нагрузки: запустите generate_data")
+        self.read_sql, self.read_params = (
+            Post.objects.for_feed()[:10].query.sql_with_params())
+        directory = tempfile.mkdtemp()
+        try:
+            report = {
+                name: self.run(self.copy_database(directory, name),
+                               engine, max_age, options)
+                for name, engine, max_age in CONFIGURATIONS
+            }
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(output + "\n")
+        self.stdout.write(output)
+
+    def copy_database(self, directory, name):
+        """Копия базы в журнальном режиме по умолчанию."""
+        path = os.path.join(directory, f"{name}.sqlite3")
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        connection.connection.backup(target)
+        target.execute("PRAGMA journal_mode = DELETE")
+        target.close()
+        return path
+
+    def operate(self, wrapper, kind, randomizer):
+        """Чтение первой страницы ленты или запись в пост."""
+        try:
+            with wrapper.cursor() as cursor:
+                if kind == "read":
+                    cursor.execute(self.read_sql, self.read_params)
+                    cursor.fetchall()
+                else:
+                    cursor.execute(WRITE_SQL,
+                                   [randomizer.choice(self.post_ids)])
+        except OperationalError:
+            return False
+        return True
+
+    def run(self, path, engine, max_age, options):
+        settings_dict = dict(connection.settings_dict, ENGINE=engine,
+                             NAME=path, OPTIONS={}, CONN_MAX_AGE=max_age,
+                             TEST={})
+        backend = load_backend(engine)
+        results = {"read": [], "write": []}
+        errors = {"read": 0, "write": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options["seconds"]
+
+        def work(kind, number):
+            randomizer = random.Random(number)
+            wrapper = None
+            while time.perf_counter() < deadline:
+                if wrapper is None:
+                    wrapper = backend.DatabaseWrapper(settings_dict,
+                                                      f"benchmark_{number}")
+                started = time.perf_counter()
+                failed = not self.operate(wrapper, kind, randomizer)
+                latency = time.perf_counter() - started
+                with lock:
+                    results[kind].append(latency)
+                    errors[kind] += failed
+                if max_age == 0:
+                    # Как при CONN_MAX_AGE=0: соединение на каждый запрос.
+                    wrapper.close()
+                    wrapper = None
+            if wrapper is not None:
+                wrapper.close()
+
+        threads = [
+            threading.Thread(target=work, args=(kind, number))
+            for number, kind in enumerate(
+                ["read"] * options["readers"]
+                + ["write"] * options["writers"])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return {kind: summarize(results[kind], errors[kind], elapsed)
+                for kind in results}
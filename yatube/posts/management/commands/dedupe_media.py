@@ -0,0 +1,139 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from sorl.thumbnail import delete as delete_thumbnails
+
+from posts.caching import POSTS_SCOPE, bump_generation
+from posts.counters import repair_counters
+from posts.models import ImageBlob, ImageVariant, Post, ThumbnailJob
+from posts.storage import is_blob_name
+
+UPLOAD_TO: str = Post._meta.get_field("image").upload_to
+
+
+class Command(BaseCommand):
+    help = ("Переносит картинки постов в хранилище по содержимому, "
+            "пересчитывает ссылки и удаляет файлы без ссылок")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Только показать, что будет перенесено и удалено",
+        )
+        parser.add_argument(
+            "--grace", type=int, default=60 * 60,
+            help="Не удалять файлы моложе этого числа секунд: их могла "
+                 "только что сохранить незавершённая загрузка",
+        )
+
+    def handle(self, *args, **options):
+        self.storage = Post._meta.get_field("image").storage
+        self.variant_storage = ImageVariant._meta.get_field("file").storage
+        self.dry_run = options["dry_run"]
+        moved = self.migrate_files()
+        if not self.dry_run:
+            repair_counters()
+        removed, freed = self.collect_garbage(options["grace"])
+        pruned = self.prune_variants()
+        if moved and not self.dry_run:
+            bump_generation(POSTS_SCOPE)
+        self.stdout.write(
+            f"Перенесено файлов: {moved}, удалено без ссылок: {removed} "
+            f"({freed / 2 ** 20:.1f} МБ), картинок с вариантами без "
+            f"файла: {pruned}")
+
+    def migrate_files(self):
+        """Переименовывает старые файлы по содержимому; дубли удаляются."""
+        names = Post.objects.exclude(image="").order_by().values_list(
+            "image", flat=True).distinct()
+        moved = 0
+        for name in list(names):
+            if is_blob_name(name):
+                continue
+            if not self.storage.exists(name):
+                self.stderr.write(f"Нет файла: {name}")
+                continue
+            moved += 1
+            if self.dry_run:
+                self.stdout.write(f"Перенос: {name}")
+                continue
+            with self.storage.open(name) as file:
+                blob = self.storage.save(name, file)
+            with transaction.atomic():
+                Post.objects.filter(image=name).update(image=blob)
+                ThumbnailJob.objects.filter(image=name).update(image=blob)
+                shared = Post.objects.filter(image=blob).exclude(
+                    thumbnail="").values_list("thumbnail", flat=True).first()
+                if shared:
+                    Post.objects.filter(image=blob, thumbnail="").update(
+                        thumbnail=shared)
+                stale = self.move_variants(name, blob)
+                ImageBlob.objects.filter(name=name).delete()
+            self.storage.delete(name)
+            for file_name in stale:
+                self.variant_storage.delete(file_name)
+        return moved
+
+    def move_variants(self, name, blob):
+        """Переносит варианты картинки на новое имя; возвращает файлы
+        лишних вариантов, если у содержимого они уже есть."""
+        variants = ImageVariant.objects.filter(image=name)
+        if not ImageVariant.objects.filter(image=blob).exists():
+            variants.update(image=blob)
+            return []
+        stale = list(variants.values_list("file", flat=True))
+        variants.delete()
+        return stale
+
+    def collect_garbage(self, grace):
+        """Удаляет файлы по содержимому, на которые не ссылается ни один
+        пост, если они не моложе grace секунд."""
+        root = self.storage.path(UPLOAD_TO)
+        deadline = time.time() - grace
+        referenced = set(ImageBlob.objects.filter(
+            ref_count__gt=0).values_list("name", flat=True))
+        removed = freed = 0
+        for directory, _, files in os.walk(root):
+            for file_name in files:
+                path = os.path.join(directory, file_name)
+                name = os.path.relpath(path, self.storage.location).replace(
+                    os.sep, "/")
+                if not is_blob_name(name) or name in referenced:
+                    continue
+                stat = os.stat(path)
+                # Счётчик мог разойтись с данными: проверяем по постам.
+                if (stat.st_mtime > deadline
+                        or Post.objects.filter(image=name).exists()):
+                    continue
+                removed += 1
+                freed += stat.st_size
+                if self.dry_run:
+                    self.stdout.write(f"Удаление: {name}")
+                    continue
+                os.remove(path)
+                ImageBlob.objects.filter(name=name, ref_count=0).delete()
+        return removed, freed
+
+    def prune_variants(self):
+        """Удаляет варианты картинок, файла которых больше нет."""
+        names = ImageVariant.objects.exclude(
+            image__in=Post.objects.values("image"),
+        ).order_by().values_list("image", flat=True).distinct()
+        pruned = 0
+        for name in list(names):
+            if self.storage.exists(name):
+                continue
+            pruned += 1
+            if self.dry_run:
+                self.stdout.write(f"Удаление вариантов: {name}")
+                continue
+            variants = ImageVariant.objects.filter(image=name)
+            for file_name in variants.values_list("file", flat=True):
+                self.variant_storage.delete(file_name)
+            variants.delete()
+            # Забываем миниатюры sorl: иначе для той же загрузки позже
+            # вернулись бы ссылки на удалённые файлы.
+            delete_thumbnails(name, delete_file=False)
+        return pruned
@@ -0,0 +1,113 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import urls
+from posts.models import Group, Post, User
+
+# Кеш фрагментов отключается, иначе часть запросов лент не выполнится.
+NO_CACHE = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+}
+
+
+def full_scans(plan, vendor):
+    """Строки плана, где таблица читается целиком или сортируется."""
+    if vendor == "sqlite":
+        return [
+            line for line in plan
+            if (line.startswith("SCAN") and "INDEX" not in line)
+            or "TEMP B-TREE" in line
+        ]
+    return [line for line in plan if "Seq Scan" in line or "Sort" in line]
+
+
+def explain(sql, vendor):
+    prefix = "EXPLAIN QUERY PLAN " if vendor == "sqlite" else "EXPLAIN "
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class Command(BaseCommand):
+    help = ("Выполняет EXPLAIN для запросов каждого адреса posts "
+            "и отмечает полные просмотры таблиц")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username",
+                            help="От чьего имени открывать страницы")
+        parser.add_argument("--verbose-plans", action="store_true",
+                            help="Печатать планы всех запросов")
+        parser.add_argument("--fail-on-scan", action="store_true",
+                            help="Завершаться ошибкой при полных просмотрах")
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in ("sqlite", "postgresql"):
+            raise CommandError(f"EXPLAIN для {vendor} не поддерживается")
+        client = Client()
+        client.force_login(self.reader(options["username"]))
+        flagged = 0
+        for name, url in self.sample_urls().items():
+            queries = self.capture(client, url)
+            self.stdout.write(f"{name} {url}: {len(queries)} запросов")
+            for sql in dict.fromkeys(queries):
+                plan = explain(sql, vendor)
+                scans = full_scans(plan, vendor)
+                flagged += bool(scans)
+                if scans or options["verbose_plans"]:
+                    self.stdout.write(f"  {sql}")
+                    for line in plan:
+                        style = (self.style.WARNING if line in scans
+                                 else str)
+                        self.stdout.write(style(f"    {line}"))
+        summary = f"Запросов с полным просмотром: {flagged}"
+        if flagged and options["fail_on_scan"]:
+            raise CommandError(summary)
+        self.stdout.write(summary)
+
+    def reader(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"Нет пользователя {username}")
+        user = User.objects.order_by("-stats__following_count").first()
+        if user is None:
+            raise CommandError("Нет данных: запустите generate_data")
+        return user
+
+    def sample_urls(self):
+        author = User.objects.order_by("-stats__post_count").first()
+        group = Group.objects.order_by("-post_count").first()
+        post = Post.objects.order_by("-comment_count").first()
+        kwargs = {}
+        if author is not None:
+            kwargs["profile"] = {"username": author.username}
+            kwargs["profile_follow"] = kwargs["profile"]
+            kwargs["profile_unfollow"] = kwargs["profile"]
+            kwargs["api_profile"] = kwargs["profile"]
+        if group is not None:
+            kwargs["group_list"] = {"slug": group.slug}
+            kwargs["api_group"] = kwargs["group_list"]
+        if post is not None:
+            for name in ("post_detail", "post_edit", "add_comment",
+                         "post_comments", "api_post"):
+                kwargs[name] = {"post_id": post.pk}
+        return {
+            pattern.name: reverse(f"posts:{pattern.name}",
+                                  kwargs=kwargs.get(pattern.name))
+            for pattern in urls.urlpatterns
+            if not pattern.pattern.converters or pattern.name in kwargs
+        }
+
+    def capture(self, client, url):
+        """SELECT-запросы страницы; изменения в базе откатываются."""
+        with override_settings(CACHES=NO_CACHE), transaction.atomic():
+            with CaptureQueriesContext(connection) as context:
+                client.get(url)
+            transaction.set_rollback(True)
+        return [query["sql"] for query in context.captured_queries
+                if query["sql"].lstrip().upper().startswith("SELECT")]
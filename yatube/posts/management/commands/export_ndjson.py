@@ -0,0 +1,26 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import EXPORT_CHUNK_SIZE, export_rows, open_stream
+
+
+class Command(BaseCommand):
+    help = ("Выгружает пользователей, группы, посты, комментарии и "
+            "подписки в NDJSON (.gz — со сжатием)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--chunk-size", type=int,
+                            default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        # Файл появляется под своим именем только целиком.
+        partial = f"{path}.part"
+        with open_stream(partial, "w", path.endswith(".gz")) as stream:
+            counts = export_rows(stream, options["chunk_size"])
+        os.replace(partial, path)
+        for name, count in counts.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"Выгружено в {path}"))
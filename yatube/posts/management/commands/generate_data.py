@@ -0,0 +1,145 @@
+import random
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from faker import Faker
+
+from posts import feed, search
+from posts.caching import POSTS_SCOPE, bump_generation
+from posts.counters import repair_counters
+from posts.models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE: int = 500
+
+
+def zipf_weights(size, exponent):
+    """Вес k-го по популярности элемента пропорционален 1 / k^exponent."""
+    return [1 / rank ** exponent for rank in range(1, size + 1)]
+
+
+class Command(BaseCommand):
+    help = ("Заполняет базу синтетическими пользователями, группами, "
+            "постами, комментариями и подписками")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=20000)
+        parser.add_argument("--comments", type=int, default=50000)
+        parser.add_argument(
+            "--follows", type=int, default=30,
+            help="Сколько авторов читает каждый пользователь",
+        )
+        parser.add_argument(
+            "--zipf", type=float, default=1.1,
+            help="Показатель распределения Ципфа для популярности авторов",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.fake = Faker("ru_RU")
+        self.fake.seed_instance(options["seed"])
+        with transaction.atomic():
+            users = self.create_users(options["users"])
+            groups = self.create_groups(options["groups"])
+            weights = zipf_weights(len(users), options["zipf"])
+            posts = self.create_posts(options["posts"], users, groups,
+                                      weights)
+            self.create_comments(options["comments"], users, posts)
+            self.create_follows(options["follows"], users, weights)
+            self.stdout.write("Пересчёт счётчиков, лент и поиска")
+            repair_counters()
+            feed.rebuild()
+            search.rebuild()
+        # bulk_create обходит сигналы: закешированные ленты сбрасываем сами.
+        bump_generation(POSTS_SCOPE)
+        self.stdout.write(self.style.SUCCESS("Данные созданы"))
+
+    def create_users(self, count):
+        password = make_password(None)
+        start = User.objects.count()
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f"{self.fake.user_name()}_{start + number}",
+                    first_name=self.fake.first_name(),
+                    last_name=self.fake.last_name(),
+                    password=password,
+                )
+                for number in range(count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        self.stdout.write(f"Пользователей: {count}")
+        # Популярность авторов случайна и не зависит от порядка создания.
+        users = list(User.objects.order_by("-id").values_list(
+            "id", flat=True)[:count])
+        self.random.shuffle(users)
+        return users
+
+    def create_groups(self, count):
+        start = Group.objects.count()
+        Group.objects.bulk_create(
+            Group(
+                title=self.fake.sentence(nb_words=3)[:200],
+                slug=f"group-{start + number}",
+                description=self.fake.paragraph(),
+            )
+            for number in range(count)
+        )
+        self.stdout.write(f"Групп: {count}")
+        return list(Group.objects.order_by("-id").values_list(
+            "id", flat=True)[:count])
+
+    def create_posts(self, count, users, groups, weights):
+        authors = self.random.choices(users, weights=weights, k=count)
+        Post.objects.bulk_create(
+            (
+                Post(
+                    author_id=author_id,
+                    group_id=(self.random.choice(groups)
+                              if groups and self.random.random() < 0.6
+                              else None),
+                    text=self.fake.paragraph(nb_sentences=5),
+                )
+                for author_id in authors
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        self.stdout.write(f"Постов: {count}")
+        return list(Post.objects.order_by("-id").values_list(
+            "id", flat=True)[:count])
+
+    def create_comments(self, count, users, posts):
+        if not posts:
+            return
+        post_weights = zipf_weights(len(posts), 1.0)
+        Comment.objects.bulk_create(
+            (
+                Comment(post_id=post_id,
+                        author_id=self.random.choice(users),
+                        text=self.fake.sentence())
+                for post_id in self.random.choices(
+                    posts, weights=post_weights, k=count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        self.stdout.write(f"Комментариев: {count}")
+
+    def create_follows(self, per_user, users, weights):
+        follows = []
+        cum_weights = list(accumulate(weights))
+        for user_id in users:
+            authors = set(self.random.choices(
+                users, cum_weights=cum_weights, k=per_user * 2))
+            authors.discard(user_id)
+            follows.extend(
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in list(authors)[:per_user]
+            )
+        Follow.objects.bulk_create(follows, batch_size=BATCH_SIZE,
+                                   ignore_conflicts=True)
+        self.stdout.write(f"Подписок: {len(follows)}")
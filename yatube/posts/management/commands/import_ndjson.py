@@ -0,0 +1,65 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import feed, search, thumbnails
+from posts.caching import POSTS_SCOPE, bump_generation
+from posts.counters import repair_counters
+from posts.transfer import IMPORT_BATCH_SIZE, import_rows, open_stream
+
+PROGRESS_EVERY: int = 10000
+
+
+class Command(BaseCommand):
+    help = ("Загружает NDJSON из export_ndjson; прерванная загрузка "
+            "продолжается с последней сохранённой пачки")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int,
+                            default=IMPORT_BATCH_SIZE)
+        parser.add_argument("--restart", action="store_true",
+                            help="Начать сначала, не учитывая прогресс")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"Нет файла {path}")
+        self.progress_path = f"{path}.progress"
+        skip = 0 if options["restart"] else self.saved_line()
+        if skip:
+            self.stdout.write(f"Продолжение со строки {skip + 1}")
+        self.counts = {}
+        with open_stream(path, "r") as stream:
+            import_rows(stream, skip, options["batch_size"],
+                        checkpoint=self.checkpoint)
+        self.stdout.write("Пересчёт счётчиков, лент и поиска")
+        repair_counters()
+        feed.rebuild()
+        search.rebuild()
+        thumbnails.enqueue_missing()
+        # bulk_create обходит сигналы: закешированные ленты сбрасываем сами.
+        bump_generation(POSTS_SCOPE)
+        if os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+        for name, count in self.counts.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS("Загрузка завершена"))
+
+    def saved_line(self):
+        try:
+            with open(self.progress_path, encoding="utf-8") as progress:
+                return json.load(progress)["line"]
+        except FileNotFoundError:
+            return 0
+
+    def checkpoint(self, line, name, count):
+        partial = f"{self.progress_path}.part"
+        with open(partial, "w", encoding="utf-8") as progress:
+            json.dump({"line": line}, progress)
+        os.replace(partial, self.progress_path)
+        before = self.counts.get(name, 0)
+        self.counts[name] = before + count
+        if before // PROGRESS_EVERY != self.counts[name] // PROGRESS_EVERY:
+            self.stdout.write(f"{name}: {self.counts[name]}")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import repair_counters
+
+
+class Command(BaseCommand):
+    help = ("Пересчитывает счётчики постов, комментариев, подписок "
+            "и ссылок на картинки")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Только показать расхождения, ничего не исправляя",
+        )
+
+    def handle(self, *args, **options):
+        drift = repair_counters(dry_run=options["dry_run"])
+        for name, rows in drift.items():
+            self.stdout.write(f"{name}: расхождений {rows}")
+        if not options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS("Счётчики пересчитаны"))
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts.caching import POSTS_SCOPE, bump_generation
+
+
+class Command(BaseCommand):
+    help = ("Копирует основную базу SQLite во все реплики "
+            "DATABASE_REPLICAS через backup API")
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != "sqlite":
+            raise CommandError("Реплики других СУБД обновляет "
+                               "их собственная репликация")
+        if source.in_atomic_block:
+            raise CommandError("Запустите команду вне транзакции")
+        source.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            target = connections[alias]
+            target.ensure_connection()
+            source.connection.backup(target.connection)
+            self.stdout.write(f"{alias}: {target.settings_dict['NAME']}")
+        # Страницы, собранные по отстававшим репликам, больше не нужны.
+        bump_generation(POSTS_SCOPE)
@@ -0,0 +1,71 @@
+import multiprocessing
+import os
+import time
+from collections import Counter
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+
+
+def init_process():
+    django.setup()
+    connections.close_all()
+
+
+def run_job(job_id):
+    try:
+        return thumbnails.process(job_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Генерирует миниатюры картинок постов из очереди в базе"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes", type=int, default=os.cpu_count(),
+            help="Число процессов; 0 — обрабатывать в текущем процессе",
+        )
+        parser.add_argument("--batch", type=int, default=20)
+        parser.add_argument("--sleep", type=float, default=2,
+                            help="Пауза при пустой очереди, секунд")
+        parser.add_argument("--once", action="store_true",
+                            help="Разобрать очередь и завершиться")
+        parser.add_argument("--backfill", action="store_true",
+                            help="Сначала поставить в очередь картинки "
+                                 "без вариантов")
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            thumbnails.enqueue_missing()
+        pool = None
+        if options["processes"]:
+            # Дочерние процессы не должны делить соединение с родителем.
+            connections.close_all()
+            pool = multiprocessing.Pool(options["processes"],
+                                        initializer=init_process)
+        statuses = Counter()
+        try:
+            while True:
+                thumbnails.requeue_stale()
+                job_ids = thumbnails.claim(options["batch"])
+                if not job_ids:
+                    if options["once"]:
+                        break
+                    time.sleep(options["sleep"])
+                    continue
+                if pool is None:
+                    statuses.update(map(thumbnails.process, job_ids))
+                else:
+                    statuses.update(pool.map(run_job, job_ids))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        self.stdout.write(", ".join(
+            f"{status}: {count}" for status, count in sorted(
+                statuses.items())) or "Очередь пуста")
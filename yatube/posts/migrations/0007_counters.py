@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Group = apps.get_model("posts", "Group")
+    Post = apps.get_model("posts", "Post")
+    AuthorStats = apps.get_model("posts", "AuthorStats")
+    for group in Group.objects.annotate(total=models.Count("posts")):
+        Group.objects.filter(pk=group.pk).update(post_count=group.total)
+    for post in Post.objects.order_by().annotate(
+            total=models.Count("comments")).filter(total__gt=0):
+        Post.objects.filter(pk=post.pk).update(comment_count=post.total)
+    for user in User.objects.all():
+        AuthorStats.objects.create(
+            user=user,
+            post_count=Post.objects.filter(author=user).count(),
+            follower_count=user.following.count(),
+            following_count=user.follower.count(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0006_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('follower_count', models.PositiveIntegerField(default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:18
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.models
+from posts.search import FTS5, tokenize
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE posts_search USING fts5("
+            "content, tokenize = 'unicode61 remove_diacritics 0')")
+    Post = apps.get_model("posts", "Post")
+    SearchEntry = apps.get_model("posts", "SearchEntry")
+    posts = Post.objects.values_list("id", "text").iterator()
+    if settings.SEARCH_BACKEND == FTS5:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO posts_search (rowid, content) VALUES (%s, %s)",
+                ((post_id, " ".join(tokenize(text)))
+                 for post_id, text in posts))
+        return
+    SearchEntry.objects.bulk_create(
+        (
+            SearchEntry(post_id=post_id, term=term, weight=weight)
+            for post_id, text in posts
+            for term, weight in Counter(tokenize(text)).items()
+        ),
+        batch_size=500,
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE posts_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='posts.Post')),
+                ('content', posts.models.SearchDocumentField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'posts_search',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(db_index=True, max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchentry',
+            constraint=models.UniqueConstraint(fields=('post', 'term'), name='unique_post_and_term'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,19 +1,59 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import content_storage
+
 User = get_user_model()
 
 
-class Group(models.Model):
+class DerivedFieldsMixin:
+    """Сохранение объекта не перезаписывает производные поля.
+
+    Счётчики и миниатюры меняются только точечными обновлениями
+    (posts.counters, posts.thumbnails), поэтому устаревшее значение
+    в памяти не должно попадать в базу.
+    """
+
+    derived_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not args
+                and kwargs.get("update_fields") is None
+                and not kwargs.get("force_insert")):
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.derived_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class Group(DerivedFieldsMixin, models.Model):
     title = models.CharField(max_length=200, verbose_name="Название группы")
     slug = models.SlugField(max_length=250, unique=True, verbose_name="URL")
     description = models.TextField(verbose_name="Описание")
+    post_count = models.PositiveIntegerField(default=0, editable=False,
+                                             verbose_name="Число постов")
+
+    derived_fields = ("post_count",)
 
     def __str__(self) -> str:
         return self.title
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для лент: автор и группа одним запросом, без лишних полей."""
+        return self.select_related("author", "group").only(
+            "text", "pub_date", "image", "thumbnail", "comment_count",
+            "author__username", "author__first_name", "author__last_name",
+            "group__slug", "group__title",
+        )
+
+
+class Post(DerivedFieldsMixin, models.Model):
     text = models.TextField(verbose_name="Текст поста")
     pub_date = models.DateTimeField(auto_now_add=True,
                                     verbose_name="Дата публикации")
@@ -30,13 +70,32 @@ class Post(models.Model):
         verbose_name="Автор"
     )
     image = models.ImageField(verbose_name="Картинка", upload_to="posts/",
-                              blank=True)
+                              storage=content_storage, blank=True)
+    comment_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Число комментариев")
+    thumbnail = models.ImageField(blank=True, editable=False,
+                                  verbose_name="Миниатюра")
+
+    derived_fields = ("comment_count", "thumbnail")
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.text[:15]
 
     class Meta:
         ordering = ["-pub_date"]
+        # Ленты читаются по ключу (pub_date, id) внутри автора или группы.
+        indexes = [
+            models.Index(fields=["-pub_date", "-id"],
+                         name="post_pub_date_idx"),
+            models.Index(fields=["author", "-pub_date", "-id"],
+                         name="post_author_pub_date_idx"),
+            models.Index(fields=["group", "-pub_date", "-id"],
+                         name="post_group_pub_date_idx"),
+            # Посты с одной картинкой: счётчик ссылок и общая миниатюра.
+            models.Index(fields=["image"], name="post_image_idx"),
+        ]
 
 
 class Comment(models.Model):
@@ -52,6 +111,12 @@ class Comment(models.Model):
     created = models.DateTimeField(verbose_name="Дата публикации",
                                    auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "created", "id"],
+                         name="comment_post_created_idx"),
+        ]
+
     def __str__(self):
         return self.text
 
@@ -67,3 +132,161 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=["user", "author"],
                                     name="unique_user_and_author"),
         ]
+        indexes = [
+            models.Index(fields=["author", "user"],
+                         name="follow_author_user_idx"),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок, заполняется при публикации поста."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="feed_entries")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="feed_entries")
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name="+")
+    pub_date = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "post"],
+                                    name="unique_user_and_post"),
+        ]
+        indexes = [
+            # Ключ ленты целиком в индексе: страница читается без сортировки.
+            models.Index(fields=["user", "-pub_date", "-post"],
+                         name="feed_user_pub_date_idx"),
+            models.Index(fields=["user", "author"],
+                         name="feed_user_author_idx"),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Счётчики пользователя, которые обновляются сигналами."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name="stats")
+    post_count = models.PositiveIntegerField(default=0,
+                                             verbose_name="Число постов")
+    follower_count = models.PositiveIntegerField(
+        default=0, verbose_name="Число подписчиков")
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name="Число подписок")
+
+
+class SearchDocumentField(models.TextField):
+    """Колонка таблицы FTS5, поддерживает поиск выражением __match."""
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class SearchDocument(models.Model):
+    """Строка таблицы FTS5 posts_search с основами слов поста.
+
+    Таблица создаётся миграцией только на SQLite, rank — скрытая
+    колонка FTS5 с оценкой bm25 (чем меньше, тем точнее совпадение).
+    """
+
+    post = models.OneToOneField(Post, on_delete=models.DO_NOTHING,
+                                primary_key=True, db_column="rowid",
+                                related_name="search_document")
+    content = SearchDocumentField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "posts_search"
+
+
+class SearchEntry(models.Model):
+    """Основа слова в посте для поиска без FTS5."""
+
+    term = models.CharField(max_length=64, db_index=True)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="search_entries")
+    weight = models.PositiveSmallIntegerField(
+        verbose_name="Число вхождений")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "term"],
+                                    name="unique_post_and_term"),
+        ]
+
+
+class ThumbnailJob(models.Model):
+    """Задание очереди на генерацию миниатюры картинки поста."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Готово"),
+        (FAILED, "Ошибка"),
+    )
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="thumbnail_jobs")
+    image = models.CharField(max_length=100, verbose_name="Картинка")
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=PENDING, verbose_name="Статус")
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name="Попытки")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created"],
+                         name="thumbnail_job_status_idx"),
+        ]
+
+
+class ImageBlob(models.Model):
+    """Файл картинки в хранилище по содержимому и число постов с ним."""
+
+    name = models.CharField(max_length=100, primary_key=True,
+                            verbose_name="Файл")
+    ref_count = models.PositiveIntegerField(default=0,
+                                            verbose_name="Число ссылок")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["ref_count"], name="image_blob_ref_idx"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ImageVariant(models.Model):
+    """Уменьшенная копия картинки для srcset: формат, ширина и высота."""
+
+    image = models.CharField(max_length=100, verbose_name="Картинка")
+    format = models.CharField(max_length=10, verbose_name="Формат")
+    width = models.PositiveIntegerField(verbose_name="Ширина")
+    height = models.PositiveIntegerField(verbose_name="Высота")
+    file = models.ImageField(verbose_name="Файл")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["image", "format", "width"],
+                                    name="image_variant_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.image} {self.format} {self.width}w"
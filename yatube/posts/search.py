@@ -0,0 +1,205 @@
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import (Case, ExpressionWrapper, F, FloatField,
+                              IntegerField, Max, Q, Sum, Value, When)
+
+from .models import Post, SearchEntry
+
+SEARCH_ORDERING = ("-search_rank", "-id")
+SEARCH_BATCH_SIZE: int = 500
+MAX_QUERY_TERMS: int = 10
+TERM_MAX_LENGTH: int = 64
+FTS5: str = "fts5"
+
+WORD = re.compile(r"\w+")
+QUERY_WORD = re.compile(r"(\w+)(\*?)")
+
+# Упрощённый стеммер Портера для русского языка (алгоритм Snowball).
+VOWELS = "аеиоуыэюя"
+RV = re.compile(f"^(.*?[{VOWELS}])(.*)$")
+PERFECTIVE_GERUND = re.compile(
+    r"(ив|ивши|ившись|ыв|ывши|ывшись|((?<=[ая])(в|вши|вшись)))$")
+REFLEXIVE = re.compile(r"(с[яь])$")
+ADJECTIVE = re.compile(
+    r"(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых"
+    r"|ую|юю|ая|яя|ою|ею)$")
+PARTICIPLE = re.compile(r"((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$")
+VERB = re.compile(
+    r"((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено"
+    r"|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|((?<=[ая])(ла|на|ете|йте|ли"
+    r"|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$")
+NOUN = re.compile(
+    r"(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем"
+    r"|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$")
+DERIVATIONAL = re.compile(f".*[^{VOWELS}]+[{VOWELS}].*ость?$")
+DERIVATIONAL_SUFFIX = re.compile(r"ость?$")
+SUPERLATIVE = re.compile(r"(ейше|ейш)$")
+
+
+def stem(word):
+    """Основа русского слова; остальные слова возвращаются как есть."""
+    match = RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+    temp = PERFECTIVE_GERUND.sub("", rv, 1)
+    if temp == rv:
+        rv = REFLEXIVE.sub("", rv, 1)
+        temp = ADJECTIVE.sub("", rv, 1)
+        if temp != rv:
+            rv = PARTICIPLE.sub("", temp, 1)
+        else:
+            temp = VERB.sub("", rv, 1)
+            rv = NOUN.sub("", rv, 1) if temp == rv else temp
+    else:
+        rv = temp
+    rv = re.sub("и$", "", rv, 1)
+    if DERIVATIONAL.match(rv):
+        rv = DERIVATIONAL_SUFFIX.sub("", rv, 1)
+    temp = re.sub("ь$", "", rv, 1)
+    if temp == rv:
+        rv = SUPERLATIVE.sub("", rv, 1)
+        rv = re.sub("нн$", "н", rv, 1)
+    else:
+        rv = temp
+    return start + rv
+
+
+def normalize(text):
+    return text.lower().replace("ё", "е")
+
+
+def tokenize(text):
+    """Основы слов текста в порядке появления."""
+    return [stem(word)[:TERM_MAX_LENGTH]
+            for word in WORD.findall(normalize(text))]
+
+
+def parse_query(query):
+    """Пары (основа, префикс?): «слово*» ищет слова с этим началом."""
+    terms = {}
+    for word, star in QUERY_WORD.findall(normalize(query)):
+        term = word if star else stem(word)
+        terms.setdefault(term[:TERM_MAX_LENGTH], bool(star))
+    return list(terms.items())[:MAX_QUERY_TERMS]
+
+
+def use_fts():
+    return settings.SEARCH_BACKEND == FTS5
+
+
+def index_post(post):
+    """Обновляет поисковый индекс поста после сохранения."""
+    terms = tokenize(post.text)
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM posts_search WHERE rowid = %s",
+                           [post.pk])
+            cursor.execute(
+                "INSERT INTO posts_search (rowid, content) VALUES (%s, %s)",
+                [post.pk, " ".join(terms)])
+        return
+    SearchEntry.objects.filter(post_id=post.pk).delete()
+    SearchEntry.objects.bulk_create(
+        SearchEntry(post_id=post.pk, term=term, weight=weight)
+        for term, weight in Counter(terms).items()
+    )
+
+
+def unindex_post(post_id):
+    # Записи SearchEntry удаляются вместе с постом каскадно.
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM posts_search WHERE rowid = %s",
+                           [post_id])
+
+
+def rebuild():
+    """Заново строит индекс по всем постам, например после bulk_create."""
+    posts = Post.objects.order_by().values_list("id", "text").iterator()
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM posts_search")
+            batch = []
+            for post_id, text in posts:
+                batch.append((post_id, " ".join(tokenize(text))))
+                if len(batch) == SEARCH_BATCH_SIZE:
+                    cursor.executemany(
+                        "INSERT INTO posts_search (rowid, content) "
+                        "VALUES (%s, %s)", batch)
+                    batch = []
+            if batch:
+                cursor.executemany(
+                    "INSERT INTO posts_search (rowid, content) "
+                    "VALUES (%s, %s)", batch)
+        return
+    SearchEntry.objects.all().delete()
+    SearchEntry.objects.bulk_create(
+        (
+            SearchEntry(post_id=post_id, term=term, weight=weight)
+            for post_id, text in posts
+            for term, weight in Counter(tokenize(text)).items()
+        ),
+        batch_size=SEARCH_BATCH_SIZE,
+    )
+
+
+def no_posts():
+    return Post.objects.none().annotate(
+        search_rank=Value(0.0, output_field=FloatField()))
+
+
+def find_posts(query):
+    """Посты, содержащие все слова запроса, с оценкой search_rank.
+
+    Чем выше search_rank, тем точнее совпадение; порядок вывода —
+    SEARCH_ORDERING.
+    """
+    terms = parse_query(query)
+    if not terms:
+        return no_posts()
+    if use_fts():
+        return fts_posts(terms)
+    return indexed_posts(terms)
+
+
+def fts_posts(terms):
+    match = " ".join(f'"{term}"*' if prefix else f'"{term}"'
+                     for term, prefix in terms)
+    return Post.objects.for_feed().filter(
+        search_document__content__match=match,
+    ).annotate(search_rank=ExpressionWrapper(
+        -F("search_document__rank"), output_field=FloatField()))
+
+
+def indexed_posts(terms):
+    """Поиск по таблице SearchEntry с оценкой TF-IDF."""
+    total = Post.objects.count()
+    condition = Q()
+    weights = []
+    found = {}
+    for number, (term, prefix) in enumerate(terms):
+        lookup = "term__startswith" if prefix else "term"
+        documents = SearchEntry.objects.filter(**{lookup: term}).values(
+            "post_id").distinct().count()
+        if not documents:
+            return no_posts()
+        match = Q(**{f"search_entries__{lookup}": term})
+        condition |= match
+        weights.append(When(match, then=ExpressionWrapper(
+            F("search_entries__weight")
+            * Value(math.log(1 + total / documents)),
+            output_field=FloatField(),
+        )))
+        found[f"search_term_{number}"] = Max(Case(
+            When(match, then=Value(1)), default=Value(0),
+            output_field=IntegerField(),
+        ))
+    return Post.objects.for_feed().filter(condition).annotate(
+        **found).filter(**{name: 1 for name in found}).annotate(
+        search_rank=Sum(Case(*weights, default=Value(0.0),
+                             output_field=FloatField())))
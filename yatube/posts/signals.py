@@ -0,0 +1,169 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import metrics
+
+from . import feed, search, thumbnails
+from .caching import POSTS_SCOPE, bump_on_commit, follow_scope
+from .counters import bump, bump_author, bump_image
+from .models import Comment, Follow, Group, Post, User
+
+# Поля автора, которые выводятся рядом с постами.
+AUTHOR_NAME_FIELDS = ("username", "first_name", "last_name")
+
+# Счётчики подключены раньше ленты: при отписке лента проверяет уже
+# обновлённое число подписчиков автора.
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, raw, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_group_id, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                "group_id", "image").first() or (None, None))
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        bump_author(instance.author_id, post_count=1)
+        if instance.group_id:
+            bump(Group, instance.group_id, post_count=1)
+        return
+    previous_group_id = getattr(instance, "_previous_group_id", None)
+    if previous_group_id != instance.group_id:
+        if previous_group_id:
+            bump(Group, previous_group_id, post_count=-1)
+        if instance.group_id:
+            bump(Group, instance.group_id, post_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    bump_author(instance.author_id, post_count=-1)
+    if instance.group_id:
+        bump(Group, instance.group_id, post_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw, **kwargs):
+    if created and not raw and instance.post_id:
+        bump(Post, instance.post_id, comment_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    if instance.post_id:
+        bump(Post, instance.post_id, comment_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        bump_author(instance.author_id, follower_count=1)
+        bump_author(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    bump_author(instance.author_id, follower_count=-1)
+    bump_author(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def count_image(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, "_previous_image",
+                                            None)
+    if previous != instance.image.name:
+        bump_image(previous, -1)
+        bump_image(instance.image.name, 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_image(sender, instance, **kwargs):
+    bump_image(instance.image.name, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Follow)
+def count_created(sender, created, raw, **kwargs):
+    if created and not raw:
+        metrics.inc("yatube_objects_created_total",
+                    model=sender._meta.model_name)
+
+
+@receiver(post_save, sender=Post)
+def queue_thumbnail(sender, instance, created, raw, **kwargs):
+    if raw or not instance.image:
+        return
+    if created or instance.image.name != getattr(
+            instance, "_previous_image", None):
+        thumbnails.enqueue(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw, **kwargs):
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        feed.push_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(sender, instance, **kwargs):
+    feed.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_feeds(sender, **kwargs):
+    bump_on_commit(POSTS_SCOPE)
+
+
+@receiver(pre_save, sender=User)
+def remember_name(sender, instance, raw, update_fields, **kwargs):
+    # Вход обновляет только last_login: имя при этом не читаем.
+    if (not instance.pk or raw or update_fields is not None
+            and not set(update_fields) & set(AUTHOR_NAME_FIELDS)):
+        return
+    instance._previous_name = User.objects.filter(
+        pk=instance.pk).values_list(*AUTHOR_NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_posts(sender, instance, created, raw, **kwargs):
+    previous = getattr(instance, "_previous_name", None)
+    instance._previous_name = None
+    name = tuple(getattr(instance, field) for field in AUTHOR_NAME_FIELDS)
+    if previous is not None and previous != name:
+        bump_on_commit(POSTS_SCOPE)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, **kwargs):
+    bump_on_commit(follow_scope(instance.user_id))
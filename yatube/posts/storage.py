@@ -0,0 +1,72 @@
+"""Хранилище картинок постов по содержимому.
+
+Имя файла — SHA-256 содержимого: posts/ab/abcdef….jpg. Одинаковые
+загрузки занимают один файл, а sorl строит для него одну миниатюру.
+Сколько постов ссылается на файл, хранит ImageBlob; файлы без ссылок
+удаляет команда dedupe_media.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE: int = 64 * 1024
+BLOB_NAME = re.compile(r"^(?P<prefix>.*/)?[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$")
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in iter(lambda: content.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def blob_name(name, digest):
+    """Имя по содержимому в каталоге исходного имени (upload_to)."""
+    directory = os.path.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    return os.path.join(directory, digest[:2], digest + extension)
+
+
+def is_blob_name(name):
+    return bool(BLOB_NAME.match(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Имя определяется содержимым, суффиксы против совпадений не нужны.
+        return name
+
+    def _save(self, name, content):
+        name = blob_name(name, content_hash(content))
+        path = self.path(name)
+        if os.path.exists(path):
+            # Свежее время изменения защищает файл от сборки мусора,
+            # пока пост с ним ещё не сохранён.
+            os.utime(path)
+            return name
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Пишем во временный файл и переименовываем: одновременная
+        # загрузка того же содержимого заменит файл идентичным.
+        handle, temporary = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(handle, "wb") as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            os.chmod(temporary, self.file_permissions_mode or 0o644)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return name
+
+
+content_storage = ContentAddressedStorage()
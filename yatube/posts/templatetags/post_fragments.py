@@ -0,0 +1,37 @@
+from django import template
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from ..caching import FRAGMENT_CACHE_TIMEOUT, post_fragment_key
+
+register = template.Library()
+
+ONE_POST_TEMPLATE: str = "includes/one_post.html"
+
+
+def page_fragments(context, posts):
+    """Фрагменты всех постов страницы одним запросом к кешу."""
+    key = ("post_fragments", id(posts))
+    if key not in context.render_context:
+        context.render_context[key] = cache.get_many(
+            [post_fragment_key(post) for post in posts])
+    return context.render_context[key]
+
+
+@register.simple_tag(takes_context=True)
+def one_post(context, post, posts=()):
+    """includes/one_post.html для поста, из кеша или заново.
+
+    posts — вся страница: тогда кеш читается один раз на страницу.
+    """
+    key = post_fragment_key(post)
+    if posts:
+        html = page_fragments(context, posts).get(key)
+    else:
+        html = cache.get(key)
+    if html is None:
+        one_post_template = context.template.engine.get_template(
+            ONE_POST_TEMPLATE)
+        html = one_post_template.render(context.new({"post": post}))
+        cache.set(key, html, FRAGMENT_CACHE_TIMEOUT)
+    return mark_safe(html)
@@ -0,0 +1,45 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from ..variants import FORMATS, MIME_TYPES, variants_for
+
+register = template.Library()
+
+SIZES: str = "(max-width: 960px) 100vw, 960px"
+IMAGE_CLASS: str = "card-img my-2"
+
+
+def srcset(variants):
+    return ", ".join(f"{variant.file.url} {variant.width}w"
+                     for variant in variants)
+
+
+@register.simple_tag
+def post_picture(post):
+    """Картинка поста: <picture> с srcset по готовым вариантам.
+
+    Пока вариантов нет, показывается миниатюра или оригинал.
+    """
+    if not post.image:
+        return ""
+    variants = variants_for(post)
+    fallback = variants.get(FORMATS[-1])
+    if not fallback:
+        source = post.thumbnail or post.image
+        return format_html('<img class="{}" src="{}" loading="lazy" alt="">',
+                           IMAGE_CLASS, source.url)
+    largest = fallback[-1]
+    image = format_html(
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" width="{}" '
+        'height="{}" loading="lazy" alt="">',
+        IMAGE_CLASS, largest.file.url, srcset(fallback), SIZES,
+        largest.width, largest.height)
+    sources = [(MIME_TYPES[image_format], srcset(variants[image_format]))
+               for image_format in FORMATS[:-1] if variants.get(image_format)]
+    if not sources:
+        return image
+    return format_html(
+        "<picture>{}{}</picture>",
+        format_html_join("", '<source type="{}" srcset="{}" sizes="' + SIZES
+                         + '">', sources),
+        image)
@@ -0,0 +1,106 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from ..models import Comment, Follow, Group, Post, User
+from ..utils import LIMIT_POSTS_ON_BOARD
+
+POSTS_COUNT: int = LIMIT_POSTS_ON_BOARD + 3
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="test_name")
+        cls.reader = User.objects.create_user(username="test_reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_slug",
+            description="Тестовое описание",
+        )
+        for number in range(POSTS_COUNT):
+            cls.post = Post.objects.create(
+                author=cls.user, group=cls.group, text=f"Пост {number}")
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text="Комментарий")
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_paginate_by_cursor(self):
+        """Все ленты API листаются курсором до конца."""
+        urls = (
+            reverse("posts:api_index"),
+            reverse("posts:api_group", args=(self.group.slug,)),
+            reverse("posts:api_profile", args=(self.user.username,)),
+            reverse("posts:api_follow"),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.reader_client.get(url).json()
+                self.assertEqual(len(first["results"]), LIMIT_POSTS_ON_BOARD)
+                self.assertEqual(first["results"][0]["text"],
+                                 self.post.text)
+                second = self.reader_client.get(
+                    url, {"cursor": first["next"]}).json()
+                self.assertEqual(len(second["results"]), 3)
+                self.assertIsNone(second["next"])
+
+    def test_field_selection(self):
+        """Параметр fields оставляет только нужные поля."""
+        url = reverse("posts:api_index")
+        data = self.guest_client.get(url, {"fields": "id,text"}).json()
+        self.assertEqual(set(data["results"][0]), {"id", "text"})
+        response = self.guest_client.get(url, {"fields": "id,password"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_detail(self):
+        """Пост отдаётся с первой порцией комментариев."""
+        data = self.guest_client.get(
+            reverse("posts:api_post", args=(self.post.pk,))).json()
+        self.assertEqual(data["comment_count"], 1)
+        self.assertEqual(data["comments"]["results"][0]["author"],
+                         self.reader.username)
+
+    def test_follow_requires_login(self):
+        """Лента подписок в API только для авторизованных."""
+        response = self.guest_client.get(reverse("posts:api_follow"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_conditional_get(self):
+        """Неизменная лента отдаёт 304, после любой записи — новые
+        данные; по одной дате ответ 304 не отдаётся."""
+        url = reverse("posts:api_index")
+        response = self.guest_client.get(url)
+        etag = response["ETag"]
+        self.assertFalse(response.has_header("Last-Modified"))
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, 200)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text="Ещё комментарий")
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["comment_count"], 2)
+        etag = response["ETag"]
+        Post.objects.filter(pk=self.post.pk).first().save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_etag_per_user(self):
+        """ETag ленты подписок у каждого пользователя свой."""
+        url = reverse("posts:api_follow")
+        etag = self.reader_client.get(url)["ETag"]
+        other_client = Client()
+        other_client.force_login(self.user)
+        response = other_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
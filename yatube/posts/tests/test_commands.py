@@ -0,0 +1,255 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import F
+from django.shortcuts import render
+from django.test import (SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+
+from ..caching import POSTS_SCOPE, generation
+from ..management.commands.benchmark import percentile, summarize
+from ..models import (AuthorStats, Comment, FeedEntry, Follow, Group,
+                      ImageBlob, ImageVariant, Post, ThumbnailJob, User)
+from ..variants import FORMATS, WIDTHS
+
+
+class GenerateDataTests(TestCase):
+    def test_generate_data(self):
+        """generate_data создаёт данные и согласованные счётчики и ленты
+        и сбрасывает кеш лент."""
+        before = generation(POSTS_SCOPE)
+        call_command("generate_data", users=20, groups=2, posts=100,
+                     comments=50, follows=5, stdout=StringIO())
+        self.assertNotEqual(generation(POSTS_SCOPE), before)
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertFalse(Follow.objects.filter(user=F("author")).exists())
+        author = AuthorStats.objects.order_by("-follower_count").first()
+        self.assertEqual(author.follower_count,
+                         Follow.objects.filter(author=author.user).count())
+        follow = Follow.objects.first()
+        self.assertEqual(
+            FeedEntry.objects.filter(user=follow.user,
+                                     author=follow.author).count(),
+            Post.objects.filter(author=follow.author).count(),
+        )
+
+
+class ExplainQueriesTests(TestCase):
+    def test_feeds_use_indexes(self):
+        """Ленты и комментарии читаются по индексам, без сортировки."""
+        call_command("generate_data", users=20, groups=2, posts=100,
+                     comments=50, follows=5, stdout=StringIO())
+        out = StringIO()
+        call_command("explain_queries", verbose_plans=True, stdout=out)
+        plans = out.getvalue()
+        for index in ("post_pub_date_idx", "post_author_pub_date_idx",
+                      "post_group_pub_date_idx", "comment_post_created_idx",
+                      "feed_user_pub_date_idx"):
+            with self.subTest(index=index):
+                self.assertIn(index, plans)
+        self.assertNotIn("TEMP B-TREE", plans)
+
+
+class BenchmarkSQLiteTests(TransactionTestCase):
+    def test_configurations_compared(self):
+        """Отчёт содержит чтение и запись для обеих настроек SQLite."""
+        call_command("generate_data", users=10, groups=2, posts=30,
+                     comments=0, follows=3, stdout=StringIO())
+        out = StringIO()
+        call_command("benchmark_sqlite", seconds=0.2, readers=2, writers=1,
+                     stdout=out)
+        report = json.loads(out.getvalue())
+        for name in ("stock", "tuned"):
+            for kind in ("read", "write"):
+                with self.subTest(name=name, kind=kind):
+                    self.assertGreater(report[name][kind]["requests"], 0)
+                    self.assertEqual(report[name][kind]["errors"], 0)
+
+
+class BenchmarkReportTests(SimpleTestCase):
+    def test_percentiles(self):
+        """Перцентили считаются по ближайшему рангу."""
+        latencies = [number / 1000 for number in range(1, 101)]
+        self.assertEqual(percentile(latencies, 50), 0.05)
+        self.assertEqual(percentile(latencies, 99), 0.099)
+        summary = summarize(latencies, errors=0, elapsed=2)
+        self.assertEqual(summary["rps"], 50)
+        self.assertEqual(summary["p95_ms"], 95)
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "dump.ndjson.gz")
+        call_command("generate_data", users=10, groups=2, posts=30,
+                     comments=20, follows=3, stdout=StringIO())
+        self.posts = list(Post.objects.order_by("id").values_list(
+            "id", "text", "pub_date", "author__username", "comment_count"))
+        call_command("export_ndjson", self.path, stdout=StringIO())
+        for model in (Follow, Comment, Post, Group):
+            model.objects.all().delete()
+        User.objects.all().delete()
+
+    def imported_posts(self):
+        return list(Post.objects.order_by("id").values_list(
+            "id", "text", "pub_date", "author__username", "comment_count"))
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка сохраняют посты, даты и счётчики
+        и сбрасывают кеш лент."""
+        before = generation(POSTS_SCOPE)
+        call_command("import_ndjson", self.path, batch_size=7,
+                     stdout=StringIO())
+        self.assertEqual(self.imported_posts(), self.posts)
+        self.assertNotEqual(generation(POSTS_SCOPE), before)
+        self.assertEqual(Comment.objects.count(), 20)
+        self.assertFalse(os.path.exists(f"{self.path}.progress"))
+
+    def test_resume_after_crash(self):
+        """Прерванная загрузка продолжается с сохранённой строки."""
+        crash = mock.Mock(side_effect=RuntimeError("сбой"))
+        with mock.patch.dict("posts.transfer.BUILDERS", comment=crash):
+            with self.assertRaises(RuntimeError):
+                call_command("import_ndjson", self.path, batch_size=7,
+                             stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertFalse(Comment.objects.exists())
+        out = StringIO()
+        call_command("import_ndjson", self.path, batch_size=7, stdout=out)
+        self.assertIn("Продолжение со строки", out.getvalue())
+        self.assertEqual(self.imported_posts(), self.posts)
+        call_command("import_ndjson", self.path, stdout=StringIO())
+        self.assertEqual(Comment.objects.count(), 20)
+
+
+def slow_render(*args, **kwargs):
+    time.sleep(0.05)
+    return render(*args, **kwargs)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_slow_request_profile(self):
+        """Стеки медленного запроса сохраняются и объединяются."""
+        with override_settings(PROFILE_DIR=self.directory,
+                               PROFILE_THRESHOLD=0.03,
+                               PROFILE_INTERVAL=0.002):
+            self.client.get("/about/author/")
+            with mock.patch("posts.views.render", slow_render):
+                self.client.get("/")
+                self.client.get("/")
+            profiles = os.listdir(self.directory)
+            self.assertEqual(len(profiles), 2)
+            self.assertIn("-posts.index-", profiles[0])
+            output = os.path.join(self.directory, "index.json")
+            out = StringIO()
+            call_command("aggregate_profiles", output=output,
+                         view="posts:index", stdout=out)
+        self.assertIn("Профилей: 2", out.getvalue())
+        self.assertIn("test_commands:slow_render", out.getvalue())
+        with open(output) as file:
+            profile = json.load(file)
+        frames = [frame["name"] for frame in profile["shared"]["frames"]]
+        self.assertIn("posts.views:index", frames)
+        self.assertTrue(profile["profiles"][0]["samples"])
+
+    def test_fast_request_not_saved(self):
+        """Быстрые запросы профиль не оставляют."""
+        with override_settings(PROFILE_DIR=self.directory,
+                               PROFILE_THRESHOLD=10):
+            self.client.get("/")
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C\x0A\x00\x3B"
+)
+
+
+class DedupeMediaTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(MEDIA_ROOT=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author = User.objects.create(username="author")
+
+    def create_post(self, image):
+        return Post.objects.create(author=self.author, text="Мем",
+                                   image=image)
+
+    def files(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.directory)
+            for directory, _, names in os.walk(self.directory)
+            for name in names if name.endswith(".gif")
+        )
+
+    def test_same_upload_stored_once(self):
+        """Одинаковые загрузки — один файл, счётчик ссылок
+        и общая миниатюра."""
+        first = self.create_post(SimpleUploadedFile("a.gif", SMALL_GIF))
+        second = self.create_post(SimpleUploadedFile("b.gif", SMALL_GIF))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.files(), [first.image.name])
+        self.assertEqual(ImageBlob.objects.get(name=first.image.name)
+                         .ref_count, 2)
+        call_command("thumbnail_worker", processes=0, once=True,
+                     stdout=StringIO())
+        thumbnails = set(Post.objects.values_list("thumbnail", flat=True))
+        self.assertEqual(len(thumbnails), 1)
+        self.assertNotIn("", thumbnails)
+        third = self.create_post(SimpleUploadedFile("c.gif", SMALL_GIF))
+        third.refresh_from_db()
+        self.assertIn(third.thumbnail.name, thumbnails)
+        self.assertFalse(ThumbnailJob.objects.filter(post=third).exists())
+
+    def test_migrate_and_collect_garbage(self):
+        """Старые файлы переносятся по содержимому, файлы без ссылок
+        удаляются."""
+        os.makedirs(os.path.join(self.directory, "posts"))
+        for name in ("old1.gif", "old2.gif"):
+            with open(os.path.join(self.directory, "posts", name),
+                      "wb") as file:
+                file.write(SMALL_GIF)
+        posts = [self.create_post("posts/old1.gif"),
+                 self.create_post("posts/old2.gif")]
+        call_command("thumbnail_worker", processes=0, once=True,
+                     stdout=StringIO())
+        variant_files = set(ImageVariant.objects.values_list("file",
+                                                             flat=True))
+        call_command("dedupe_media", grace=0, stdout=StringIO())
+        names = set(Post.objects.values_list("image", flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(self.files(), sorted(names))
+        blob = ImageBlob.objects.get()
+        self.assertEqual((blob.name, blob.ref_count), (names.pop(), 2))
+        self.assertEqual(
+            set(ImageVariant.objects.values_list("image", flat=True)),
+            {blob.name})
+        self.assertEqual(ImageVariant.objects.count(),
+                         len(FORMATS) * len(WIDTHS))
+        for post in posts:
+            post.delete()
+        call_command("dedupe_media", grace=0, stdout=StringIO())
+        self.assertEqual(self.files(), [])
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(ImageVariant.objects.exists())
+        for name in variant_files:
+            self.assertFalse(default_storage.exists(name))
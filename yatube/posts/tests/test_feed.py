@@ -0,0 +1,112 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import FeedEntry, Follow, Post, User
+from ..utils import LIMIT_POSTS_ON_BOARD
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.follower = User.objects.create_user(username="test_follower")
+        cls.author = User.objects.create_user(username="test_author")
+        cls.other = User.objects.create_user(username="test_other")
+        cls.old_post = Post.objects.create(author=cls.author,
+                                           text="Старый пост")
+
+    def setUp(self):
+        self.client_follower = Client()
+        self.client_follower.force_login(self.follower)
+
+    def feed(self):
+        response = self.client_follower.get(reverse("posts:follow_index"))
+        return list(response.context["page_obj"])
+
+    def test_follow_backfills_feed(self):
+        """Подписка добавляет в ленту уже опубликованные посты."""
+        self.client_follower.get(
+            reverse("posts:profile_follow", args=(self.author.username,)))
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост попадает только в ленты подписчиков."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text="Новый пост")
+        Post.objects.create(author=self.other, text="Чужой пост")
+        self.assertEqual(self.feed(), [post, self.old_post])
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.other).exists())
+
+    def test_unfollow_prunes_feed(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.client_follower.get(
+            reverse("posts:profile_unfollow", args=(self.author.username,)))
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.follower).exists())
+
+
+@override_settings(FEED_CELEBRITY_FOLLOWERS=2)
+class HybridFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.follower = User.objects.create_user(username="test_follower")
+        cls.fan = User.objects.create_user(username="test_fan")
+        cls.celebrity = User.objects.create_user(username="test_celebrity")
+        cls.author = User.objects.create_user(username="test_author")
+        for user in (cls.follower, cls.fan):
+            Follow.objects.create(user=user, author=cls.celebrity)
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        self.client_follower = Client()
+        self.client_follower.force_login(self.follower)
+
+    def test_celebrity_posts_are_pulled(self):
+        """Посты знаменитости не рассылаются, но видны в ленте."""
+        posts = []
+        for number in range(LIMIT_POSTS_ON_BOARD + 2):
+            author = self.celebrity if number % 2 else self.author
+            posts.append(Post.objects.create(author=author,
+                                             text=f"Пост {number}"))
+        self.assertFalse(
+            FeedEntry.objects.filter(author=self.celebrity).exists())
+        posts.reverse()
+        response = self.client_follower.get(reverse("posts:follow_index"))
+        self.assertEqual(list(response.context["page_obj"]),
+                         posts[:LIMIT_POSTS_ON_BOARD])
+        cursor = response.context["page_obj"].paginator.next_cursor
+        response = self.client_follower.get(
+            reverse("posts:follow_index"), {"cursor": cursor})
+        self.assertEqual(list(response.context["page_obj"]),
+                         posts[LIMIT_POSTS_ON_BOARD:])
+
+    def test_page_number_merges_sources(self):
+        """Страница по номеру собирается из обоих источников ленты."""
+        posts = [Post.objects.create(author=self.celebrity,
+                                     text=f"Пост {number}")
+                 for number in range(25)]
+        posts += [Post.objects.create(author=self.author,
+                                      text=f"Рассылка {number}")
+                  for number in range(5)]
+        posts.reverse()
+        for number in (1, 2, 3):
+            with self.subTest(page=number):
+                response = self.client_follower.get(
+                    reverse("posts:follow_index"), {"page": number})
+                page_obj = response.context["page_obj"]
+                self.assertEqual(page_obj.paginator.count, len(posts))
+                start = (number - 1) * LIMIT_POSTS_ON_BOARD
+                self.assertEqual(
+                    list(page_obj),
+                    posts[start:start + LIMIT_POSTS_ON_BOARD])
+
+    def test_former_celebrity_posts_are_pushed(self):
+        """После потери подписчиков посты автора рассылаются заново."""
+        post = Post.objects.create(author=self.celebrity, text="Пост")
+        Follow.objects.get(user=self.fan, author=self.celebrity).delete()
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.follower, post=post).exists())
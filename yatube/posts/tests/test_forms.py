@@ -1,9 +1,17 @@
+import shutil
+import tempfile
 from http import HTTPStatus
+from io import BytesIO
 
-from django.test import Client, TestCase
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from ..images import EXTENSIONS, FORMAT
 from ..models import Comment, Group, Post, User
+from ..storage import is_blob_name
 
 
 class PostFormTests(TestCase):
@@ -109,3 +117,50 @@ class PostFormTests(TestCase):
         self.assertTrue(
             Comment.objects.filter(text=form_data["text"]).exists()
         )
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageIngestTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create(username="photographer")
+        self.client.force_login(self.user)
+
+    def upload(self, size=(3000, 2000), name="photo.jpg"):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90° по часовой.
+        exif[0x010F] = "Camera"
+        Image.new("RGB", size, (200, 30, 30)).save(buffer, "JPEG",
+                                                   exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(),
+                                  content_type="image/jpeg")
+
+    def test_image_normalized(self):
+        """Картинка поворачивается по EXIF, уменьшается и теряет EXIF."""
+        response = self.client.post(reverse("posts:post_create"), {
+            "text": "Пост с фото", "image": self.upload()})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        post = Post.objects.get(text="Пост с фото")
+        self.assertTrue(is_blob_name(post.image.name))
+        self.assertTrue(post.image.name.endswith(EXTENSIONS[FORMAT]))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, FORMAT)
+            self.assertEqual(image.size, (1067, 1600))
+            self.assertEqual(dict(image.getexif()), {})
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1000)
+    def test_decompression_bomb_rejected(self):
+        """Слишком большой кадр отклоняется до декодирования."""
+        response = self.client.post(reverse("posts:post_create"), {
+            "text": "Бомба", "image": self.upload(size=(100, 100))})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn("image", response.context["form"].errors)
+        self.assertFalse(Post.objects.filter(text="Бомба").exists())
@@ -1,6 +1,9 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import AuthorStats, Comment, Follow, Group, Post, User
 
 
 class PostModelTest(TestCase):
@@ -24,3 +27,58 @@ class PostModelTest(TestCase):
         obj_name = PostModelTest.post.text[:15]
         self.assertEqual(expected_object_name, str(PostModelTest.group))
         self.assertEqual(obj_name, str(PostModelTest.post))
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_slug",
+            description="Тестовое описание",
+        )
+        cls.other_group = Group.objects.create(
+            title="Другая группа",
+            slug="other_slug",
+            description="Тестовое описание",
+        )
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        post = Post.objects.create(author=self.user, text="Тестовый пост",
+                                   group=self.group)
+        Comment.objects.create(post=post, author=self.reader, text="Ок")
+        Follow.objects.create(user=self.reader, author=self.user)
+        post.group = self.other_group
+        post.save()
+        stats = AuthorStats.objects.get(user=self.user)
+        self.assertEqual(stats.post_count, 1)
+        self.assertEqual(stats.follower_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 0)
+        self.assertEqual(self.other_group.post_count, 1)
+        post.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.post_count, 0)
+
+    def test_repair_counters(self):
+        """Команда repair_counters исправляет рассинхронизацию."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text="Тестовый пост", group=self.group)
+            for _ in range(3)
+        )
+        out = StringIO()
+        call_command("repair_counters", stdout=out)
+        self.assertIn("Group.post_count: расхождений 1", out.getvalue())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 3)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).post_count, 3)
@@ -0,0 +1,121 @@
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post, User
+from ..utils import LIMIT_POSTS_ON_BOARD, CursorPaginator
+
+POSTS_COUNT: int = LIMIT_POSTS_ON_BOARD * 2 + 3
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="test_name")
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f"Пост {number}")
+            for number in range(POSTS_COUNT)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def walk_forward(self):
+        paginator = CursorPaginator(Post.objects.all(), LIMIT_POSTS_ON_BOARD)
+        page = paginator.get_page()
+        pages = [page]
+        while paginator.has_next:
+            cursor = paginator.next_cursor
+            paginator = CursorPaginator(
+                Post.objects.all(), LIMIT_POSTS_ON_BOARD)
+            page = paginator.get_page(cursor=cursor)
+            pages.append(page)
+        return pages
+
+    def test_pages_cover_all_posts_once(self):
+        """Переход по курсорам выдаёт все посты без повторов."""
+        pages = self.walk_forward()
+        expected = list(Post.objects.order_by("-pub_date", "-id"))
+        self.assertEqual([post for page in pages for post in page], expected)
+        self.assertEqual([page.number for page in pages], [1, 2, 3])
+        self.assertIsInstance(pages[0], Page)
+
+    def test_first_page_skips_count(self):
+        """Первая страница не выполняет COUNT(*)."""
+        paginator = CursorPaginator(Post.objects.all(), LIMIT_POSTS_ON_BOARD)
+        with self.assertNumQueries(1):
+            page = paginator.get_page()
+            list(page)
+        self.assertTrue(paginator.has_next)
+        self.assertFalse(paginator.has_previous)
+
+    def test_previous_cursor_returns_same_page(self):
+        """Курсор назад возвращает предыдущую страницу целиком."""
+        pages = self.walk_forward()
+        paginator = CursorPaginator(Post.objects.all(), LIMIT_POSTS_ON_BOARD)
+        paginator.get_page()
+        second = CursorPaginator(Post.objects.all(), LIMIT_POSTS_ON_BOARD)
+        second.get_page(cursor=paginator.next_cursor)
+        back = CursorPaginator(Post.objects.all(), LIMIT_POSTS_ON_BOARD)
+        page = back.get_page(cursor=second.previous_cursor)
+        self.assertEqual(list(page), list(pages[0]))
+        self.assertEqual(page.number, 1)
+        self.assertFalse(back.has_previous)
+
+    def test_last_page_matches_offset(self):
+        """Последняя страница совпадает с последней страницей по OFFSET."""
+        paginator = CursorPaginator(Post.objects.all(), LIMIT_POSTS_ON_BOARD)
+        page = paginator.get_page(cursor="last")
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), POSTS_COUNT % LIMIT_POSTS_ON_BOARD)
+        self.assertFalse(paginator.has_next)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор не ломает страницу."""
+        response = self.guest_client.get(
+            reverse("posts:index"), {"cursor": "не-курсор"})
+        self.assertEqual(response.context["page_obj"].number, 1)
+        self.assertEqual(
+            len(response.context["page_obj"]), LIMIT_POSTS_ON_BOARD)
+
+    def test_legacy_page_number(self):
+        """Старые ссылки вида ?page=N продолжают работать."""
+        response = self.guest_client.get(reverse("posts:index"), {"page": 3})
+        self.assertEqual(response.context["page_obj"].number, 3)
+        self.assertEqual(
+            len(response.context["page_obj"]),
+            POSTS_COUNT % LIMIT_POSTS_ON_BOARD)
+
+    def test_page_window_without_count(self):
+        """Окно страниц строится без COUNT(*) и обрывается пропуском."""
+        paginator = CursorPaginator(Post.objects.all(), 2)
+        page = paginator.get_page()
+        while paginator.has_next and page.number < 6:
+            cursor = paginator.next_cursor
+            paginator = CursorPaginator(Post.objects.all(), 2)
+            with self.assertNumQueries(1):
+                page = paginator.get_page(cursor=cursor)
+                list(page)
+        self.assertEqual(paginator.page_window,
+                         [1, "…", 4, 5, 6, 7, "…"])
+        self.assertNotIn("count", paginator.__dict__)
+
+    def test_page_window_with_known_end(self):
+        """После COUNT(*) окно показывает последнюю страницу номером."""
+        paginator = CursorPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.num_pages, 12)
+        self.assertEqual(paginator.elided_page_range(1),
+                         [1, 2, 3, "…", 12])
+        self.assertEqual(paginator.elided_page_range(7),
+                         [1, "…", 5, 6, 7, 8, 9, "…", 12])
+        self.assertEqual(paginator.elided_page_range(11),
+                         [1, "…", 9, 10, 11, 12])
+
+    def test_paginator_renders_only_window(self):
+        """В шаблоне выводится окно, а не все страницы."""
+        response = self.guest_client.get(reverse("posts:index"), {"page": 1})
+        self.assertContains(response, 'class="page-link"', count=4)
+        self.assertContains(response, "?cursor=last")
@@ -0,0 +1,137 @@
+import json
+import os
+import re
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import urls
+from ..counters import repair_counters
+from ..models import Comment, Follow, Group, Post, User
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "query_budget.json")
+# UPDATE_QUERY_BUDGET=1 перезаписывает базовый файл текущими запросами.
+UPDATE_BASELINE = os.environ.get("UPDATE_QUERY_BUDGET") == "1"
+USERS_COUNT: int = 30
+GROUPS_COUNT: int = 5
+POSTS_COUNT: int = 300
+COMMENTS_COUNT: int = 200
+FOLLOWS_PER_USER: int = 10
+
+
+def normalize(sql):
+    """SQL без конкретных значений: так запросы сравнимы между прогонами."""
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+    return re.sub(r"\((?:\?, )+\?\)", "(...)", sql)
+
+
+class QueryBudgetTests(TestCase):
+    """Число SQL-запросов каждого адреса posts сверяется с query_budget.json.
+
+    Если запросов стало больше, тест падает и показывает добавленные.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        users = [User.objects.create_user(username=f"user_{number}")
+                 for number in range(USERS_COUNT)]
+        groups = Group.objects.bulk_create(
+            Group(title=f"Группа {number}", slug=f"group_{number}",
+                  description="Описание")
+            for number in range(GROUPS_COUNT)
+        )
+        Post.objects.bulk_create(
+            Post(author=users[number % USERS_COUNT],
+                 group=groups[number % GROUPS_COUNT] if number % 3 else None,
+                 text=f"Пост {number}")
+            for number in range(POSTS_COUNT)
+        )
+        posts = list(Post.objects.order_by("id"))
+        Comment.objects.bulk_create(
+            Comment(post=posts[number % 10],
+                    author=users[number % USERS_COUNT],
+                    text=f"Комментарий {number}")
+            for number in range(COMMENTS_COUNT)
+        )
+        for number, user in enumerate(users):
+            for shift in range(1, FOLLOWS_PER_USER + 1):
+                Follow.objects.create(
+                    user=user, author=users[(number + shift) % USERS_COUNT])
+        repair_counters()
+        cls.user = users[0]
+        cls.author = users[1]
+        cls.post = posts[0]
+        cls.group = groups[0]
+        with open(BASELINE_PATH, encoding="utf-8") as baseline:
+            cls.baseline = {} if UPDATE_BASELINE else json.load(baseline)
+        cls.report = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if UPDATE_BASELINE:
+            with open(BASELINE_PATH, "w", encoding="utf-8") as baseline:
+                json.dump(cls.report, baseline, ensure_ascii=False,
+                          indent=2, sort_keys=True)
+                baseline.write("\n")
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def sample_urls(self):
+        kwargs = {
+            "group_list": {"slug": self.group.slug},
+            "profile": {"username": self.author.username},
+            "post_detail": {"post_id": self.post.pk},
+            "post_edit": {"post_id": self.post.pk},
+            "add_comment": {"post_id": self.post.pk},
+            "post_comments": {"post_id": self.post.pk},
+            "api_group": {"slug": self.group.slug},
+            "api_profile": {"username": self.author.username},
+            "api_post": {"post_id": self.post.pk},
+            "profile_follow": {"username": self.author.username},
+            "profile_unfollow": {"username": self.author.username},
+        }
+        return {
+            pattern.name: reverse(f"posts:{pattern.name}",
+                                  kwargs=kwargs.get(pattern.name))
+            for pattern in urls.urlpatterns
+        }
+
+    def measure(self, url):
+        cache.clear()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(url)
+            transaction.set_rollback(True)
+        queries = [normalize(query["sql"])
+                   for query in context.captured_queries]
+        sql_time = sum(float(query["time"])
+                       for query in context.captured_queries)
+        return queries, sql_time
+
+    def test_views_fit_query_budget(self):
+        """Каждый адрес posts укладывается в бюджет запросов."""
+        for name, url in self.sample_urls().items():
+            queries, sql_time = self.measure(url)
+            self.report[name] = {"queries": len(queries), "sql": queries}
+            if UPDATE_BASELINE:
+                continue
+            with self.subTest(name=name, sql_time=f"{sql_time:.3f}s"):
+                self.assertIn(name, self.baseline,
+                              f"Для {name} нет бюджета в query_budget.json")
+                budget = self.baseline[name]
+                added = Counter(queries) - Counter(budget["sql"])
+                self.assertLessEqual(
+                    len(queries), budget["queries"],
+                    f"{name}: {len(queries)} запросов ({sql_time:.3f} с) "
+                    f"при бюджете {budget['queries']}, добавлены:\n"
+                    + "\n".join(added.elements()),
+                )
@@ -0,0 +1,95 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, User
+from ..search import find_posts, rebuild, stem
+from ..utils import LIMIT_POSTS_ON_BOARD
+
+
+class StemTests(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы одного слова сводятся к общей основе."""
+        forms = (
+            ("кошка", "кошки", "кошкой"),
+            ("программирование", "программированию"),
+            ("читать", "читаете", "читал"),
+        )
+        for words in forms:
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="test_name")
+        cls.cat = Post.objects.create(
+            author=cls.user, text="Кошка спит на окне")
+        cls.cats = Post.objects.create(
+            author=cls.user, text="Кошки, кошки и ещё раз кошки")
+        cls.code = Post.objects.create(
+            author=cls.user, text="Программирование на Python")
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_finds_word_forms_ranked(self):
+        """Поиск находит формы слова, чаще встречающееся — выше."""
+        found = list(find_posts("кошкой").order_by("-search_rank", "-id"))
+        self.assertEqual(found, [self.cats, self.cat])
+
+    def test_all_words_required(self):
+        """В результатах только посты со всеми словами запроса."""
+        self.assertEqual(list(find_posts("кошка окно")), [self.cat])
+        self.assertFalse(find_posts("кошка python").exists())
+
+    def test_prefix_query(self):
+        """Слово со звёздочкой ищется по началу."""
+        self.assertEqual(list(find_posts("програм*")), [self.code])
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        post = Post.objects.create(author=self.user, text="Собака лает")
+        self.assertEqual(list(find_posts("собаки")), [post])
+        post.text = "Попугай молчит"
+        post.save()
+        self.assertFalse(find_posts("собака").exists())
+        self.assertEqual(list(find_posts("попугаи")), [post])
+        post.delete()
+        self.assertFalse(find_posts("попугай").exists())
+
+    def test_rebuild(self):
+        """Индекс восстанавливается после массовой загрузки постов."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f"Массовый пост {number}")
+            for number in range(3))
+        rebuild()
+        self.assertEqual(find_posts("массовые").count(), 3)
+
+    def test_search_page(self):
+        """Страница поиска выводит найденное и пагинацию с запросом."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f"Кошка номер {number}")
+            for number in range(LIMIT_POSTS_ON_BOARD))
+        rebuild()
+        url = reverse("posts:search")
+        response = self.guest_client.get(url, {"q": "кошки"})
+        self.assertEqual(len(response.context["page_obj"]),
+                         LIMIT_POSTS_ON_BOARD)
+        self.assertContains(response, "?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B8"
+                                      "&amp;cursor=")
+        cursor = response.context["page_obj"].paginator.next_cursor
+        response = self.guest_client.get(url, {"q": "кошки",
+                                               "cursor": cursor})
+        self.assertEqual(len(response.context["page_obj"]), 2)
+
+    def test_empty_query(self):
+        """Пустой запрос не выполняет поиск."""
+        response = self.guest_client.get(reverse("posts:search"))
+        self.assertEqual(len(response.context["page_obj"]), 0)
+
+
+@override_settings(SEARCH_BACKEND="python")
+class IndexedSearchTests(SearchTests):
+    """Те же проверки для обратного индекса без FTS5."""
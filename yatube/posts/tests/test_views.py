@@ -1,14 +1,26 @@
+import hashlib
 import shutil
 import tempfile
+from io import StringIO
 
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post, User
+from .. import thumbnails
+from ..caching import POSTS_SCOPE, generation, post_fragment_key
+from ..models import (Comment, Follow, Group, ImageVariant, Post, ThumbnailJob,
+                      User)
+from ..utils import LIMIT_COMMENTS_ON_PAGE, LIMIT_POSTS_ON_BOARD
+from ..variants import FORMATS, WIDTHS
+from .utils import QueryBudgetMixin
 
 
 class PostPagesTests(TestCase):
@@ -170,12 +182,82 @@ class PostPagesTests(TestCase):
             text='Тестовый текст',
             author=self.user)
         response = self.guest_client.get(reverse("posts:index"))
-        post.delete()
+        Post.objects.filter(pk=post.pk).update(text="Без сигналов")
         response_cache = self.guest_client.get(reverse("posts:index"))
         self.assertEqual(response.content, response_cache.content)
         cache.clear()
         response_clear = self.guest_client.get(reverse("posts:index"))
-        self.assertNotEqual(response, response_clear)
+        self.assertNotEqual(response.content, response_clear.content)
+
+    def test_cached_feed_skips_queries(self):
+        """Лента из кеша не читает посты из базы."""
+        for client, name in ((self.guest_client, "posts:index"),
+                             (self.client_follower, "posts:follow_index")):
+            with self.subTest(name=name):
+                client.get(reverse(name))
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse([query for query in queries
+                                  if "posts_post" in query["sql"]])
+
+    def test_cache_invalidated_on_write(self):
+        """Запись поста сразу сбрасывает закешированную ленту."""
+        post = Post.objects.create(
+            text='Тестовый текст',
+            author=self.user)
+        response = self.guest_client.get(reverse("posts:index"))
+        post.delete()
+        response_deleted = self.guest_client.get(reverse("posts:index"))
+        self.assertNotEqual(response.content, response_deleted.content)
+        self.assertNotIn(post.text.encode(), response_deleted.content)
+
+    def test_follow_page_not_served_from_index_cache(self):
+        """Лента подписок не берёт фрагмент главной страницы."""
+        self.client_follower.get(reverse("posts:index"))
+        response = self.client_follower.get(reverse("posts:follow_index"))
+        self.assertNotContains(response, self.post.text)
+        Post.objects.create(text="Пост автора", author=self.following)
+        response = self.client_follower.get(reverse("posts:follow_index"))
+        self.assertContains(response, "Пост автора")
+
+    def test_post_fragments(self):
+        """Страница собирается из фрагментов постов; правка поста
+        и смена имени автора сбрасывают только их фрагменты."""
+        other = Post.objects.create(text="Другой пост", author=self.no_user,
+                                    group=self.group)
+        url = reverse("posts:group_list", kwargs={"slug": self.group.slug})
+        self.guest_client.get(url)
+        cache.set(post_fragment_key(other), "<p>Из кеша</p>")
+        self.authorized_client.post(
+            reverse("posts:post_edit", args=(self.post.pk,)),
+            {"text": "Исправленный пост", "group": self.group.pk})
+        response = self.guest_client.get(url)
+        self.assertContains(response, "Исправленный пост")
+        self.assertContains(response, "Из кеша")
+        User.objects.filter(pk=self.user.pk).update(first_name="Новое")
+        response = self.guest_client.get(url)
+        self.assertContains(response, "Автор: Новое")
+        self.assertContains(response, "Из кеша")
+
+    def test_author_rename_invalidates_pages(self):
+        """Смена имени автора сбрасывает кеш лент и ETag API,
+        вход пользователя — нет."""
+        url = reverse("posts:index")
+        api_url = reverse("posts:api_index")
+        self.guest_client.get(url)
+        etag = self.guest_client.get(api_url)["ETag"]
+        self.client.force_login(self.user)
+        self.assertEqual(
+            self.guest_client.get(api_url, HTTP_IF_NONE_MATCH=etag)
+            .status_code, 304)
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = "Новое"
+        author.save()
+        self.assertContains(self.guest_client.get(url), "Автор: Новое")
+        self.assertEqual(
+            self.guest_client.get(api_url, HTTP_IF_NONE_MATCH=etag)
+            .status_code, 200)
 
     def test_follow_page(self):
         """Новая запись пользователя появляется в ленте тех,
@@ -200,6 +282,16 @@ class PostPagesTests(TestCase):
                 user_id=self.follower, author_id=self.following).count(), 0)
 
 
+class CacheCommitTests(TransactionTestCase):
+    def test_generation_bumped_after_commit(self):
+        """Страницы, собранные до фиксации записи, после неё не отдаются."""
+        author = User.objects.create_user(username="author")
+        with transaction.atomic():
+            Post.objects.create(author=author, text="Пост в транзакции")
+            before_commit = generation(POSTS_SCOPE)
+        self.assertNotEqual(generation(POSTS_SCOPE), before_commit)
+
+
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
@@ -273,6 +365,132 @@ class PicturePagesTests(TestCase):
     def test_image_in_page(self):
         """Проверяем что пост с картинкой создается в БД"""
         self.authorized_client.post(reverse("posts:post_create"))
+        digest = hashlib.sha256(self.small_gif).hexdigest()
         self.assertTrue(
             Post.objects.filter(text="Тестовый текст",
-                                image="posts/small.gif").exists())
+                                image=f"posts/{digest[:2]}/{digest}.gif")
+            .exists())
+
+    def test_thumbnail_built_by_worker(self):
+        """Миниатюру строит воркер, до этого показывается оригинал."""
+        job = ThumbnailJob.objects.get(post=self.post)
+        self.assertEqual(job.status, ThumbnailJob.PENDING)
+        response = self.guest_client.get(reverse("posts:index"))
+        self.assertContains(response, self.post.image.url)
+        call_command("thumbnail_worker", processes=0, once=True,
+                     stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ThumbnailJob.DONE)
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.thumbnail)
+        response = self.guest_client.get(reverse("posts:index"))
+        self.assertContains(response, self.post.thumbnail.url)
+
+    def test_job_of_deleted_post(self):
+        """Задание удалённого поста не останавливает воркер."""
+        job_ids = thumbnails.claim(1)
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(thumbnails.process(job_ids[0]), thumbnails.MISSING)
+
+    def test_variants_in_srcset(self):
+        """Воркер записывает варианты, страница выводит их в srcset."""
+        call_command("thumbnail_worker", processes=0, once=True,
+                     stdout=StringIO())
+        variants = ImageVariant.objects.filter(image=self.post.image.name)
+        self.assertEqual(variants.count(), len(FORMATS) * len(WIDTHS))
+        response = self.guest_client.get(reverse("posts:index"))
+        for variant in variants:
+            self.assertContains(response,
+                                f"{variant.file.url} {variant.width}w")
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, f'width="{max(WIDTHS)}"')
+
+
+class FeedQueriesTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="test_reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_slug",
+            description="Тестовое описание",
+        )
+        for number in range(LIMIT_POSTS_ON_BOARD):
+            author = User.objects.create_user(
+                username=f"author_{number}", first_name=f"Автор {number}")
+            Follow.objects.create(user=cls.reader, author=author)
+            Post.objects.create(author=author, group=cls.group,
+                                text=f"Тестовый пост {number}")
+
+    def setUp(self):
+        cache.clear()
+        self.client_reader = Client()
+        self.client_reader.force_login(self.reader)
+
+    def test_feeds_do_not_query_per_post(self):
+        """Число запросов ленты не зависит от числа авторов на странице."""
+        author = User.objects.get(username="author_0")
+        urls = {
+            reverse("posts:index"): 3,
+            reverse("posts:group_list", args=(self.group.slug,)): 4,
+            reverse("posts:profile", args=(author.username,)): 5,
+            reverse("posts:follow_index"): 4,
+        }
+        for url, budget in urls.items():
+            with self.subTest(url=url):
+                with self.assertMaxQueries(budget):
+                    response = self.client_reader.get(url)
+                self.assertEqual(response.status_code, 200)
+
+
+class CommentsPagesTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="test_name")
+        cls.post = Post.objects.create(author=cls.user, text="Тестовый пост")
+        authors = [User.objects.create_user(username=f"reader_{number}")
+                   for number in range(3)]
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=authors[number % 3],
+                    text=f"Комментарий {number}")
+            for number in range(LIMIT_COMMENTS_ON_PAGE + 5)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_post_detail_shows_first_comments(self):
+        """Пост показывает первую порцию комментариев без запросов авторов."""
+        with self.assertMaxQueries(4):
+            response = self.guest_client.get(
+                reverse("posts:post_detail", args=(self.post.pk,)))
+        comments = response.context["comments"]
+        self.assertEqual(len(comments), LIMIT_COMMENTS_ON_PAGE)
+        self.assertEqual(comments[0].text, "Комментарий 0")
+        self.assertContains(response, "data-comments-url")
+
+    def test_more_comments_fragment(self):
+        """Кнопка «Показать ещё» получает остаток комментариев фрагментом."""
+        response = self.guest_client.get(
+            reverse("posts:post_detail", args=(self.post.pk,)))
+        cursor = response.context["comments"].paginator.next_cursor
+        response = self.guest_client.get(
+            reverse("posts:post_comments", args=(self.post.pk,)),
+            {"cursor": cursor})
+        self.assertTemplateUsed(response, "posts/includes/comments.html")
+        self.assertEqual(len(response.context["comments"]), 5)
+        self.assertContains(response, "Комментарий 24")
+        self.assertNotContains(response, "data-comments-url")
+
+    def test_more_comments_json(self):
+        """С format=json порция комментариев отдаётся в JSON."""
+        url = reverse("posts:post_comments", args=(self.post.pk,))
+        data = self.guest_client.get(url, {"format": "json"}).json()
+        self.assertEqual(len(data["comments"]), LIMIT_COMMENTS_ON_PAGE)
+        self.assertEqual(data["comments"][0]["author"], "reader_0")
+        data = self.guest_client.get(
+            url, {"format": "json", "cursor": data["next"]}).json()
+        self.assertEqual(len(data["comments"]), 5)
+        self.assertIsNone(data["next"])
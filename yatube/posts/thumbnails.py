@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from core import timing
+
+from .caching import POSTS_SCOPE, bump_generation
+from .models import ImageVariant, Post, ThumbnailJob
+from .variants import FORMATS, WIDTHS
+
+THUMBNAIL_SIZE = (960, 339)
+THUMBNAIL_OPTIONS = {"crop": "center", "upscale": True}
+MAX_ATTEMPTS: int = 3
+ENQUEUE_BATCH_SIZE: int = 500
+# Задание в статусе running дольше этого считается брошенным
+# упавшим процессом и возвращается в очередь.
+STALE_AFTER = timedelta(minutes=10)
+# Итог задания, удалённого вместе с постом до обработки.
+MISSING: str = "missing"
+
+
+def enqueue(post):
+    """Ставит картинку поста в очередь и сбрасывает старую миниатюру.
+
+    Если у другого поста с той же картинкой миниатюра уже есть,
+    пост получает её сразу, без задания.
+    """
+    shared = Post.objects.filter(image=post.image.name).exclude(
+        pk=post.pk).exclude(thumbnail="")
+    post.thumbnail = shared.values_list("thumbnail", flat=True).first() or ""
+    Post.objects.filter(pk=post.pk).update(thumbnail=post.thumbnail)
+    if not post.thumbnail:
+        ThumbnailJob.objects.create(post=post, image=post.image.name)
+
+
+def requeue_stale():
+    return ThumbnailJob.objects.filter(
+        status=ThumbnailJob.RUNNING,
+        updated__lt=timezone.now() - STALE_AFTER,
+    ).update(status=ThumbnailJob.PENDING, updated=timezone.now())
+
+
+def claim(limit):
+    """Забирает до limit заданий; параллельные воркеры их не получат."""
+    pending = ThumbnailJob.objects.filter(status=ThumbnailJob.PENDING)
+    claimed = []
+    for job_id in pending.order_by("created").values_list(
+            "id", flat=True)[:limit]:
+        if pending.filter(id=job_id).update(
+                status=ThumbnailJob.RUNNING, attempts=F("attempts") + 1,
+                updated=timezone.now()):
+            claimed.append(job_id)
+    return claimed
+
+
+def build_variants(image):
+    """Строит варианты картинки всех ширин и форматов и записывает их.
+
+    Возвращает имя самого широкого варианта запасного формата —
+    миниатюры поста.
+    """
+    width, height = THUMBNAIL_SIZE
+    variants = []
+    for image_format in FORMATS:
+        for variant_width in WIDTHS:
+            variant_height = round(variant_width * height / width)
+            thumbnail = get_thumbnail(
+                image, f"{variant_width}x{variant_height}",
+                format=image_format, **THUMBNAIL_OPTIONS)
+            variants.append(ImageVariant(
+                image=image, format=image_format, width=thumbnail.width,
+                height=thumbnail.height, file=thumbnail.name))
+    ImageVariant.objects.bulk_create(variants, ignore_conflicts=True)
+    return variants[-1].file.name
+
+
+def finish(job, **fields):
+    """Записывает итог задания, если его не удалили вместе с постом."""
+    ThumbnailJob.objects.filter(pk=job.pk).update(updated=timezone.now(),
+                                                  **fields)
+    return fields["status"]
+
+
+def process(job_id):
+    """Строит варианты картинки задания и записывает миниатюру в пост."""
+    job = ThumbnailJob.objects.filter(id=job_id).first()
+    if job is None:
+        # Пост удалили вместе с заданием, пока оно ждало воркера.
+        return MISSING
+    try:
+        with timing.measure("thumbnail"):
+            thumbnail_name = build_variants(job.image)
+    except Exception as error:
+        return finish(job, error=str(error), status=(
+            ThumbnailJob.FAILED if job.attempts >= MAX_ATTEMPTS
+            else ThumbnailJob.PENDING))
+    # Миниатюра общая для всех постов с этой картинкой; у поста
+    # задания картинку могли заменить, пока задание ждало в очереди.
+    if Post.objects.filter(image=job.image).update(
+            thumbnail=thumbnail_name):
+        bump_generation(POSTS_SCOPE)
+    return finish(job, status=ThumbnailJob.DONE)
+
+
+def enqueue_missing():
+    """Ставит в очередь картинки без вариантов, например после импорта."""
+    posts = Post.objects.exclude(image="").exclude(
+        image__in=ImageVariant.objects.values("image"),
+    ).exclude(
+        thumbnail_jobs__status__in=(ThumbnailJob.PENDING,
+                                    ThumbnailJob.RUNNING),
+    ).values_list("pk", "image")
+    ThumbnailJob.objects.bulk_create(
+        (ThumbnailJob(post_id=pk, image=image)
+         for pk, image in posts.iterator()),
+        batch_size=ENQUEUE_BATCH_SIZE,
+    )
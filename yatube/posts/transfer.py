@@ -0,0 +1,188 @@
+"""Потоковый перенос пользователей, групп, постов, комментариев и подписок
+в формате NDJSON: одна JSON-запись на строку, {"model": ..., "fields": ...}.
+
+На пользователей и группы записи ссылаются по username и slug, посты
+и комментарии сохраняют свои id, поэтому повторный импорт того же файла
+ничего не дублирует. Пароли и файлы картинок не переносятся.
+"""
+import gzip
+import json
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post, User
+
+EXPORT_CHUNK_SIZE: int = 2000
+IMPORT_BATCH_SIZE: int = 500
+
+# Порядок важен: при импорте ссылки указывают на уже загруженные строки.
+EXPORTS = (
+    ("user", User, ("username", "first_name", "last_name", "email",
+                    "date_joined")),
+    ("group", Group, ("slug", "title", "description")),
+    ("post", Post, ("id", "text", "pub_date", "author__username",
+                    "group__slug", "image")),
+    ("comment", Comment, ("id", "post_id", "author__username", "text",
+                          "created")),
+    ("follow", Follow, ("user__username", "author__username")),
+)
+
+
+def open_stream(path, mode, compressed=None):
+    """Файл NDJSON; с расширением .gz читается и пишется через gzip."""
+    if compressed is None:
+        compressed = path.endswith(".gz")
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def encode_value(value):
+    # Даты целиком, с микросекундами: от них зависит порядок лент.
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} не сериализуется в JSON")
+
+
+def export_rows(stream, chunk_size=EXPORT_CHUNK_SIZE):
+    """Пишет все строки в stream и возвращает их число по моделям."""
+    encoder = json.JSONEncoder(ensure_ascii=False, default=encode_value)
+    counts = {}
+    for name, model, fields in EXPORTS:
+        counts[name] = 0
+        rows = model.objects.order_by("pk").values(*fields)
+        for row in rows.iterator(chunk_size=chunk_size):
+            stream.write(encoder.encode({"model": name, "fields": row}))
+            stream.write("\n")
+            counts[name] += 1
+    return counts
+
+
+@contextmanager
+def original_dates():
+    """Отключает auto_now_add, чтобы даты из файла не заменялись."""
+    fields = [field for model in (User, Post, Comment)
+              for field in model._meta.concrete_fields
+              if getattr(field, "auto_now_add", False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def read_batches(stream, skip=0, batch_size=IMPORT_BATCH_SIZE):
+    """Пачки (модель, записи, номер последней строки) подряд идущих строк.
+
+    Первые skip строк пропускаются без разбора JSON.
+    """
+    name, batch, number = None, [], 0
+    for number, line in enumerate(stream, 1):
+        if number <= skip or not line.strip():
+            continue
+        record = json.loads(line)
+        if batch and (record["model"] != name or len(batch) == batch_size):
+            yield name, batch, number - 1
+            batch = []
+        name = record["model"]
+        batch.append(record["fields"])
+    if batch:
+        yield name, batch, number
+
+
+def user_ids(usernames):
+    return dict(User.objects.filter(username__in=set(usernames))
+                .values_list("username", "pk"))
+
+
+def build_user(rows):
+    password = make_password(None)
+    return User, [
+        User(username=row["username"], first_name=row["first_name"],
+             last_name=row["last_name"], email=row["email"],
+             date_joined=parse_datetime(row["date_joined"]),
+             password=password)
+        for row in rows
+    ]
+
+
+def build_group(rows):
+    return Group, [Group(slug=row["slug"], title=row["title"],
+                         description=row["description"]) for row in rows]
+
+
+def build_post(rows):
+    authors = user_ids(row["author__username"] for row in rows)
+    groups = dict(Group.objects.filter(
+        slug__in={row["group__slug"] for row in rows}
+    ).values_list("slug", "pk"))
+    return Post, [
+        Post(id=row["id"], text=row["text"],
+             pub_date=parse_datetime(row["pub_date"]),
+             author_id=authors[row["author__username"]],
+             group_id=groups.get(row["group__slug"]), image=row["image"])
+        for row in rows if row["author__username"] in authors
+    ]
+
+
+def build_comment(rows):
+    authors = user_ids(row["author__username"] for row in rows)
+    posts = set(Post.objects.filter(
+        pk__in={row["post_id"] for row in rows}).values_list("pk", flat=True))
+    return Comment, [
+        Comment(id=row["id"], text=row["text"],
+                created=parse_datetime(row["created"]),
+                author_id=authors[row["author__username"]],
+                post_id=row["post_id"] if row["post_id"] in posts else None)
+        for row in rows if row["author__username"] in authors
+    ]
+
+
+def build_follow(rows):
+    users = user_ids(
+        username for row in rows
+        for username in (row["user__username"], row["author__username"]))
+    return Follow, [
+        Follow(user_id=users[row["user__username"]],
+               author_id=users[row["author__username"]])
+        for row in rows
+        if row["user__username"] in users
+        and row["author__username"] in users
+    ]
+
+
+BUILDERS = {
+    "user": build_user,
+    "group": build_group,
+    "post": build_post,
+    "comment": build_comment,
+    "follow": build_follow,
+}
+
+
+def import_rows(stream, skip=0, batch_size=IMPORT_BATCH_SIZE,
+                checkpoint=None):
+    """Загружает строки пачками, каждая пачка — своя транзакция.
+
+    Уже существующие строки пропускаются. После каждой пачки вызывается
+    checkpoint(номер_строки, модель, число_строк): с этого номера можно
+    продолжить прерванный импорт. Сигналы при bulk_create не срабатывают,
+    поэтому счётчики, ленты и поиск нужно пересчитать после загрузки.
+    """
+    with original_dates():
+        for name, rows, line in read_batches(stream, skip, batch_size):
+            if name not in BUILDERS:
+                raise ValueError(f"Неизвестная модель в строке {line}: "
+                                 f"{name}")
+            with transaction.atomic():
+                model, objects = BUILDERS[name](rows)
+                model.objects.bulk_create(objects, batch_size=batch_size,
+                                          ignore_conflicts=True)
+            if checkpoint is not None:
+                checkpoint(line, name, len(rows))
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 
 app_name = "posts"
@@ -13,7 +13,15 @@ urlpatterns = [
     path("posts/<int:post_id>/edit/", views.post_edit, name="post_edit"),
     path("posts/<int:post_id>/comment/", views.add_comment,
          name="add_comment"),
+    path("posts/<int:post_id>/comments/", views.post_comments,
+         name="post_comments"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search, name="search"),
+    path("api/posts/", api.index, name="api_index"),
+    path("api/group/<slug:slug>/", api.group_posts, name="api_group"),
+    path("api/profile/<str:username>/", api.profile, name="api_profile"),
+    path("api/posts/<int:post_id>/", api.post_detail, name="api_post"),
+    path("api/follow/", api.follow_index, name="api_follow"),
     path("profile/<str:username>/follow/", views.profile_follow,
          name="profile_follow"),
     path("profile/<str:username>/unfollow/", views.profile_unfollow,
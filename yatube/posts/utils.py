@@ -1,12 +1,195 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import SimpleLazyObject
+
+from .variants import attach
 
 LIMIT_POSTS_ON_BOARD: int = 10
+LIMIT_COMMENTS_ON_PAGE: int = 20
+COMMENT_ORDERING = ("created", "id")
+CURSOR_LAST: str = "last"
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (pub_date, id) вместо OFFSET.
+
+    Страница выбирается условием на ключ соседней записи, поэтому
+    глубокие страницы читаются по индексу так же быстро, как первая.
+    COUNT(*) выполняется только при обращении к count или num_pages.
+    Номер страницы передаётся внутри курсора и нужен лишь для вывода.
+    """
+
+    ELLIPSIS = "…"
+    ordering = ("-pub_date", "-id")
+
+    def __init__(self, object_list, per_page, ordering=None, **kwargs):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        super().__init__(object_list.order_by(*self.ordering), per_page,
+                         **kwargs)
+        self.fields = [name.lstrip("-") for name in self.ordering]
+        self.has_next = False
+        self.has_previous = False
+        self.next_cursor = None
+        self.previous_cursor = None
+        self.page_window = []
+
+    def get_page(self, number=None, cursor=None):
+        """Страница по курсору, номеру (через OFFSET) или первая."""
+        if cursor == CURSOR_LAST:
+            return self.last_page()
+        if cursor:
+            try:
+                return self.seek(*self.decode_cursor(cursor))
+            except (ValueError, ValidationError):
+                pass
+        if number is None:
+            return self.seek(1, None, forward=True)
+        page = super().get_page(number)
+        self.remember(page, page.has_previous(), page.has_next())
+        return page
+
+    def fetch(self, values, forward, limit):
+        """Первые limit записей после ключа values в выбранную сторону."""
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self.seek_filter(values, forward))
+        if not forward:
+            queryset = queryset.reverse()
+        return list(queryset[:limit])
+
+    def seek(self, number, values, forward):
+        items = self.fetch(values, forward, self.per_page + 1)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if forward:
+            has_previous, has_next = values is not None, has_more
+        else:
+            items.reverse()
+            has_previous, has_next = has_more, True
+        if not has_previous:
+            number = 1
+        page = self._get_page(items, number, self)
+        self.remember(page, has_previous, has_next)
+        return page
+
+    def last_page(self):
+        """Последняя страница: столько записей, сколько дал бы OFFSET."""
+        number = self.num_pages
+        size = self.count - (number - 1) * self.per_page
+        items = self.fetch(None, False, size)
+        items.reverse()
+        page = self._get_page(items, number, self)
+        self.remember(page, number > 1, False)
+        return page
+
+    def remember(self, page, has_previous, has_next):
+        self.has_previous = has_previous
+        self.has_next = has_next
+        self.page_window = self.elided_page_range(page.number)
+        items = list(page.object_list)
+        self.previous_cursor = None
+        self.next_cursor = None
+        if has_previous and items:
+            self.previous_cursor = self.encode_cursor(
+                items[0], page.number - 1, forward=False)
+        if has_next and items:
+            self.next_cursor = self.encode_cursor(
+                items[-1], page.number + 1, forward=True)
+
+    def elided_page_range(self, number, on_each_side=2, on_ends=1):
+        """Края и окрестность текущей страницы, пропуски — ELLIPSIS.
+
+        Длина списка не зависит от числа страниц. Пока COUNT(*) не
+        выполнялся, последняя страница неизвестна: список обрывается на
+        следующей странице и пропуске.
+        """
+        known_end = "count" in self.__dict__
+        last = (self.num_pages if known_end
+                else number + 1 if self.has_next else number)
+        pages = []
+        if number > on_each_side + on_ends + 1:
+            pages.extend(range(1, on_ends + 1))
+            pages.append(self.ELLIPSIS)
+            pages.extend(range(number - on_each_side, number + 1))
+        else:
+            pages.extend(range(1, number + 1))
+        if not known_end:
+            pages.extend(range(number + 1, last + 1))
+            if self.has_next:
+                pages.append(self.ELLIPSIS)
+        elif last - number > on_each_side + on_ends + 1:
+            pages.extend(range(number + 1, number + on_each_side + 1))
+            pages.append(self.ELLIPSIS)
+            pages.extend(range(last - on_ends + 1, last + 1))
+        else:
+            pages.extend(range(number + 1, last + 1))
+        return pages
+
+    def seek_filter(self, values, forward):
+        condition = Q()
+        for position, name in enumerate(self.fields):
+            descending = self.ordering[position].startswith("-")
+            lookup = "lt" if descending == forward else "gt"
+            step = Q(**{f"{name}__{lookup}": values[position]})
+            for previous in range(position):
+                step &= Q(**{self.fields[previous]: values[previous]})
+            condition |= step
+        return condition
+
+    def key_field(self, name):
+        annotations = self.object_list.query.annotations
+        if name in annotations:
+            return annotations[name].output_field
+        return self.object_list.model._meta.get_field(name)
+
+    def encode_cursor(self, obj, number, forward):
+        values = []
+        for name in self.fields:
+            value = getattr(obj, name)
+            values.append(value.isoformat() if isinstance(value, datetime)
+                          else str(value))
+        raw = "|".join(["n" if forward else "p", str(number)] + values)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(
+                cursor + "=" * (-len(cursor) % 4)).decode()
+        except (binascii.Error, UnicodeError):
+            raise ValueError("Некорректный курсор")
+        direction, number, *values = raw.split("|")
+        if direction not in ("n", "p") or len(values) != len(self.fields):
+            raise ValueError("Некорректный курсор")
+        values = [self.key_field(name).to_python(value)
+                  for name, value in zip(self.fields, values)]
+        return max(int(number), 1), values, direction == "n"
+
+
+def func_paginator(queryset, request, ordering=None,
+                   paginator_class=CursorPaginator):
+    """Страница ленты, которая читается из базы при первом обращении.
+
+    Ленты под {% cache %} не трогают страницу, если фрагмент найден,
+    и тогда обходятся без запросов к постам. Номер страницы становится
+    известен, когда прочитаны её записи.
+    """
+    paginator = paginator_class(queryset, LIMIT_POSTS_ON_BOARD, ordering)
+    page_obj = Page([], 1, paginator)
 
+    def load():
+        page = paginator.get_page(request.GET.get("page"),
+                                  request.GET.get("cursor"))
+        attach(page)
+        page_obj.number = page.number
+        return list(page)
 
-def func_paginator(queryset, request):
-    paginator = Paginator(queryset, LIMIT_POSTS_ON_BOARD)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj.object_list = SimpleLazyObject(load)
     context = {
         "page_obj": page_obj,
     }
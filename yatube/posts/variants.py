@@ -0,0 +1,54 @@
+"""Готовые уменьшенные копии картинок постов для srcset.
+
+Варианты строит воркер миниатюр (posts.thumbnails) один раз на файл
+картинки и записывает в ImageVariant с размерами, поэтому страницы
+обходятся без обращений к sorl: варианты всех постов страницы читаются
+одним запросом, и только если фрагмент поста не найден в кеше.
+"""
+from collections import defaultdict
+
+from PIL import features
+
+from .models import ImageVariant
+
+# Последний формат — запасной, для <img src> и старых браузеров.
+FORMATS = ("WEBP", "JPEG") if features.check("webp") else ("JPEG",)
+WIDTHS = (320, 640, 960)
+MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+
+def load(names):
+    """Варианты картинок: {имя: {формат: [варианты по ширине]}}."""
+    variants = defaultdict(lambda: defaultdict(list))
+    if names:
+        for variant in ImageVariant.objects.filter(
+                image__in=names).order_by("image", "format", "width"):
+            variants[variant.image][variant.format].append(variant)
+    return variants
+
+
+class VariantLoader:
+    """Варианты картинок всех постов страницы, при первом обращении."""
+
+    def __init__(self, posts):
+        self.names = {post.image.name for post in posts if post.image}
+        self.variants = None
+
+    def get(self, name):
+        if self.variants is None:
+            self.variants = load(self.names)
+        return self.variants.get(name, {})
+
+
+def attach(posts):
+    """Даёт постам страницы общий загрузчик вариантов."""
+    loader = VariantLoader(posts)
+    for post in posts:
+        post.variant_loader = loader
+
+
+def variants_for(post):
+    loader = getattr(post, "variant_loader", None)
+    if loader is None:
+        loader = post.variant_loader = VariantLoader([post])
+    return loader.get(post.image.name)
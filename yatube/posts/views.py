@@ -1,5 +1,13 @@
-from .utils import func_paginator
+from urllib.parse import urlencode
+
+from .caching import follow_scope, fragment_context
+from .counters import author_stats
+from .feed import FEED_ORDERING, FeedPaginator, feed_sources
+from .search import SEARCH_ORDERING, find_posts
+from .utils import (COMMENT_ORDERING, LIMIT_COMMENTS_ON_PAGE,
+                    CursorPaginator, func_paginator)
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, render, redirect
 from .forms import PostForm, CommentForm
 from .models import Group, Post, User, Comment, Follow
@@ -7,7 +15,8 @@ from .models import Group, Post, User, Comment, Follow
 
 def index(request):
     context = func_paginator(
-        Post.objects.all().select_related("group"), request)
+        Post.objects.for_feed(), request)
+    context.update(fragment_context(request))
     return render(request, "posts/index.html", context)
 
 
@@ -16,13 +25,14 @@ def group_posts(request, slug):
     context = {
         "group": group,
     }
-    context.update(func_paginator(group.posts.all(), request))
+    context.update(func_paginator(group.posts.for_feed(), request))
     return render(request, "posts/group_list.html", context)
 
 
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    post_count = user.posts.count()
+    user = get_object_or_404(User.objects.select_related("stats"),
+                             username=username)
+    post_count = author_stats(user).post_count
     following = request.user.is_authenticated
     if following:
         following = user.following.filter(user=request.user).exists()
@@ -31,15 +41,45 @@ def profile(request, username):
         "post_count": post_count,
         "following": following,
     }
-    context.update(func_paginator(user.posts.all(), request))
+    context.update(func_paginator(user.posts.for_feed(), request))
     return render(request, "posts/profile.html", context)
 
 
+def search(request):
+    query = request.GET.get("q", "").strip()
+    context = {
+        "query": query,
+        "page_query": urlencode({"q": query}) + "&",
+    }
+    context.update(func_paginator(find_posts(query), request,
+                                  SEARCH_ORDERING))
+    return render(request, "posts/search.html", context)
+
+
+def comments_page(post, cursor=None):
+    """Порция комментариев поста по ключу (created, id) вместе с авторами."""
+    comments = Comment.objects.filter(post=post).select_related(
+        "author").only("text", "created", "author__username")
+    paginator = CursorPaginator(comments, LIMIT_COMMENTS_ON_PAGE,
+                                COMMENT_ORDERING)
+    return paginator.get_page(cursor=cursor)
+
+
+def comment_data(comment):
+    return {
+        "id": comment.pk,
+        "author": comment.author.username,
+        "text": comment.text,
+        "created": comment.created.isoformat(),
+    }
+
+
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    author_posts = post.author.posts.count()
+    post = get_object_or_404(
+        Post.objects.select_related("author__stats", "group"), pk=post_id)
+    author_posts = author_stats(post.author).post_count
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post=post)
+    comments = comments_page(post, request.GET.get("comments"))
     context = {
         "post": post,
         "author_posts": author_posts,
@@ -49,10 +89,28 @@ def post_detail(request, post_id):
     return render(request, "posts/post_detail.html", context)
 
 
+def post_comments(request, post_id):
+    """Следующая порция комментариев для кнопки «Показать ещё»."""
+    post = get_object_or_404(Post.objects.only("pk"), pk=post_id)
+    comments = comments_page(post, request.GET.get("cursor"))
+    if (request.GET.get("format") == "json"
+            or "application/json" in request.META.get("HTTP_ACCEPT", "")):
+        paginator = comments.paginator
+        return JsonResponse({
+            "comments": [comment_data(comment) for comment in comments],
+            "next": paginator.next_cursor if paginator.has_next else None,
+        })
+    context = {
+        "post": post,
+        "comments": comments,
+    }
+    return render(request, "posts/includes/comments.html", context)
+
+
 @login_required()
 def post_create(request):
     if request.method == "POST":
-        form = PostForm(request.POST)
+        form = PostForm(request.POST, files=request.FILES or None)
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
@@ -96,11 +154,10 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    follower = Follow.objects.filter(user=request.user).values_list(
-        "author_id", flat=True
-    )
-    posts = Post.objects.filter(author_id__in=follower)
-    context = func_paginator(posts, request)
+    context = func_paginator(feed_sources(request.user), request,
+                             FEED_ORDERING, FeedPaginator)
+    context.update(fragment_context(
+        request, follow_scope(request.user.pk), per_user=True))
     return render(request, "posts/follow.html", context)
 
 
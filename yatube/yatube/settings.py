@@ -33,6 +33,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.PerformanceMiddleware",
+    "core.middleware.ProfilingMiddleware",
+    "core.middleware.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -46,7 +49,7 @@ ROOT_URLCONF = "yatube.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.template.TimedDjangoTemplates",
         "DIRS": [os.path.join(BASE_DIR, "templates")],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -63,17 +66,35 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "yatube.wsgi.application"
 
+# Кеш, метрики и журналы тестов — во временном каталоге.
+TEST_RUNNER = "core.runner.TestRunner"
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Соединения постоянные: у каждого потока воркера своё, и оно не
+# открывается заново на каждый запрос.
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "core.db.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        "CONN_MAX_AGE": None,
     }
 }
 
+# Реплики только для чтения: пути к копиям базы через запятую. Копии
+# обновляет команда sync_replicas; в тестах реплики совпадают с основной.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+        filter(None, os.environ.get("DATABASE_REPLICAS", "").split(","))):
+    DATABASES[f"replica{number}"] = dict(
+        DATABASES["default"], NAME=name, TEST={"MIRROR": "default"})
+    DATABASE_REPLICAS.append(f"replica{number}")
+DATABASE_ROUTERS = ["core.db.routers.ReplicaRouter"]
+READ_YOUR_WRITES_SECONDS = 15
+REPLICA_PIN_COOKIE = "primary_until"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -121,8 +142,70 @@ STATIC_URL = "/static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Загрузки всегда пишутся во временный файл кусками, а не в память.
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+POST_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_MAX_SIDE = 1600
+
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": "core.cache.SQLiteCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache.sqlite3"),
+        "OPTIONS": {
+            "MAX_BYTES": 64 * 1024 * 1024,
+            "L1_MAX_ENTRIES": 300,
+            "L1_TIMEOUT": 2,
+        },
     }
 }
+
+# Авторы с таким числом подписчиков не рассылают посты по лентам,
+# их посты подмешиваются в ленту при чтении
+FEED_CELEBRITY_FOLLOWERS = 1000
+
+# Полнотекстовый поиск: таблица FTS5 на SQLite, иначе собственный
+# обратный индекс в таблице SearchEntry ("python").
+SEARCH_BACKEND = (
+    "fts5" if DATABASES["default"]["ENGINE"].endswith("sqlite3")
+    else "python"
+)
+
+# Доля запросов, для которых PerformanceMiddleware собирает метрики
+# (заголовок Server-Timing и строка в performance.log).
+PERFORMANCE_SAMPLE_RATE = float(
+    os.environ.get("PERFORMANCE_SAMPLE_RATE", "1"))
+
+# Файлы метрик всех процессов сервера; каталог очищается при деплое.
+METRICS_DIR = os.environ.get("METRICS_DIR",
+                             os.path.join(BASE_DIR, "metrics"))
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
+
+# Профили запросов дольше PROFILE_THRESHOLD секунд; пустое значение
+# отключает профайлер.
+PROFILE_THRESHOLD = os.environ.get("PROFILE_THRESHOLD", "1")
+PROFILE_THRESHOLD = float(PROFILE_THRESHOLD) if PROFILE_THRESHOLD else None
+PROFILE_INTERVAL = 0.005
+PROFILE_MODULES = ("posts.views",)
+PROFILE_DIR = os.path.join(BASE_DIR, "profiles")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "performance": {
+            "class": "logging.handlers.WatchedFileHandler",
+            "filename": os.path.join(BASE_DIR, "performance.log"),
+            "delay": True,
+        },
+    },
+    "loggers": {
+        "yatube.performance": {
+            "handlers": ["performance"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}